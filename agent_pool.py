@@ -0,0 +1,101 @@
+# agent_pool.py
+# Structure-of-arrays storage for ecosystem agents. Every attribute is one NumPy array
+# indexed by agent, so lifecycle, feeding and decay run as vectorized passes over the
+# whole population instead of method calls on thousands of Agent objects.
+import numpy as np
+
+MALE, FEMALE = 0, 1
+INITIAL_CAPACITY = 1024
+
+# Attribute name -> dtype of its column
+FIELDS = {
+    "uid": np.int64,  # Stable id; increases along the pool, since additions append and compaction keeps order
+    "x": np.float64,
+    "y": np.float64,
+    "alive": np.bool_,
+    "removed": np.bool_,  # Expired carcasses, left in place as tombstones until the pool is compacted
+    "birth_tick": np.float64,  # Age is the current tick minus this
+    "max_age": np.float64,
+    "last_fed": np.int64,  # Starvation days are the current tick minus this
+    "mature": np.bool_,
+    "meat_calories": np.float64,  # Carcasses: meat at death_tick, decayed lazily by the Map
+    "death_tick": np.int64,
+    "species": np.int16,
+    "sex": np.int8,
+}
+
+
+class AgentPool:
+    def __init__(self, capacity=INITIAL_CAPACITY):
+        self.count = 0
+        self.next_uid = 0
+        for name, dtype in FIELDS.items():
+            setattr(self, name, np.zeros(capacity, dtype=dtype))
+
+    def __len__(self):
+        return self.count
+
+    @property
+    def capacity(self):
+        return len(self.alive)
+
+    def reserve(self, capacity):
+        # Grow geometrically so a run of small additions stays amortized O(1) per agent
+        if capacity <= self.capacity:
+            return
+        capacity = max(capacity, 2 * self.capacity)
+        for name in FIELDS:
+            column = getattr(self, name)
+            grown = np.zeros(capacity, dtype=column.dtype)
+            grown[:self.count] = column[:self.count]
+            setattr(self, name, grown)
+
+    def add(self, species, locations, birth_ticks, max_ages, sexes, meat_calories, last_fed):
+        number = len(locations)
+        self.reserve(self.count + number)
+        new = slice(self.count, self.count + number)
+        self.uid[new] = np.arange(self.next_uid, self.next_uid + number)
+        self.next_uid += number
+        self.x[new] = locations[:, 0]
+        self.y[new] = locations[:, 1]
+        self.alive[new] = True
+        self.removed[new] = False
+        self.birth_tick[new] = birth_ticks
+        self.max_age[new] = max_ages
+        self.last_fed[new] = last_fed
+        self.mature[new] = False
+        self.meat_calories[new] = meat_calories
+        self.death_tick[new] = 0
+        self.species[new] = species
+        self.sex[new] = sexes
+        self.count += number
+        return np.arange(new.start, new.stop)
+
+    def keep(self, mask):
+        # Compact the first count entries down to those where mask is set, preserving order
+        kept = int(np.count_nonzero(mask))
+        for name in FIELDS:
+            column = getattr(self, name)
+            column[:kept] = column[:self.count][mask]
+        self.count = kept
+
+    def find(self, uids):
+        # Pool indices of the agents with these uids, -1 for agents no longer in the pool
+        indices = np.searchsorted(self.uid[:self.count], uids)
+        found = indices < self.count
+        found[found] = self.uid[indices[found]] == uids[found]
+        return np.where(found, indices, -1)
+
+    def locations(self):
+        return np.column_stack((self.x[:self.count], self.y[:self.count]))
+
+
+def pool_field(name):
+    # Property reading and writing one agent's entry in a pool column
+    def get(view):
+        return getattr(view.pool, name)[view.index].item()
+
+    def set(view, value):
+        getattr(view.pool, name)[view.index] = value
+
+    return property(get, set)
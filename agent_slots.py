@@ -0,0 +1,61 @@
+# agent_slots.py
+# Slot storage for a Map's Agent objects. Removing an agent leaves a tombstone in its
+# slot and pushes the slot onto a free list, and new agents fill free slots before the
+# list grows, so a tick that drops and adds agents allocates nothing in proportion to
+# the population. Tombstones are squeezed out, preserving order, only once they make
+# up more than COMPACT_FRACTION of the slots. Per-diet views are kept alongside, so
+# environments never have to rescan the population to find their carnivores.
+
+COMPACT_FRACTION = 0.25
+MIN_COMPACT_SLOTS = 64  # Smaller lists are never worth compacting
+
+
+class AgentSlots:
+    def __init__(self):
+        self.slots = []
+        self.free = []
+        self.live = 0
+        self.diets = {}  # diet -> insertion-ordered dict of its agents, used as an ordered set
+
+    def __len__(self):
+        return self.live
+
+    def __iter__(self):
+        # Live agents in slot order; agents removed mid-iteration are skipped
+        for agent in self.slots:
+            if agent is not None:
+                yield agent
+
+    def add(self, agent):
+        if self.free:
+            agent.slot = self.free.pop()
+            self.slots[agent.slot] = agent
+        else:
+            agent.slot = len(self.slots)
+            self.slots.append(agent)
+        self.live += 1
+        self.diets.setdefault(agent.species['diet'], {})[agent] = None
+
+    def remove(self, agent):
+        self.slots[agent.slot] = None
+        self.free.append(agent.slot)
+        agent.slot = None
+        self.live -= 1
+        del self.diets[agent.species['diet']][agent]
+
+    def with_diet(self, diet):
+        # Live view of the agents with this diet, in the order they were added
+        return self.diets.setdefault(diet, {}).keys()
+
+    def fragmentation(self):
+        return len(self.free) / len(self.slots) if self.slots else 0.0
+
+    def compact(self):
+        # Drop tombstones once they pass COMPACT_FRACTION; never call this mid-iteration
+        if len(self.slots) < MIN_COMPACT_SLOTS or self.fragmentation() <= COMPACT_FRACTION:
+            return False
+        self.slots[:] = [agent for agent in self.slots if agent is not None]
+        for slot, agent in enumerate(self.slots):
+            agent.slot = slot
+        self.free.clear()
+        return True
@@ -0,0 +1,187 @@
+# benchmark_population.py
+# Times each phase of the ecosystem Map's simulate_agents (lifecycle, grazing, carnivore
+# feeding and its neighbour search, carcass decay, pool compaction, births, movement)
+# for populations from a thousand to a million agents, at configurable carnivore and
+# carcass fractions. Every configuration runs in a fresh process so its peak RSS is its
+# own. Results are written as JSON so runs of different engines or commits can be diffed.
+import os
+os.environ.setdefault("SDL_VIDEODRIVER", "dummy")
+os.environ.setdefault("SDL_AUDIODRIVER", "dummy")
+
+import argparse
+import json
+import math
+import multiprocessing
+import platform
+import resource
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime, timezone
+import numpy as np
+
+POPULATIONS = [1000, 10000, 100000, 1000000]
+CARNIVORE_FRACTIONS = [0.1]
+CARCASS_FRACTIONS = [0.0, 0.2]
+DENSITY = 0.05  # Agents per pixel when the map is sized to the population
+MIN_PIXELS = 400
+TICKS = 20
+WARMUP_TICKS = 2
+# Map method (or "pool.<method>") -> phase it is timed under; nested phases are also counted in their caller
+PHASES = {
+    "fire_lifecycle_events": "lifecycle",
+    "simulate_resources": "grazing",
+    "feed_carnivores": "feeding",
+    "index_agents": "neighbour_index",
+    "query_radius": "neighbour_query",
+    "remove_expired_carcasses": "decay",
+    "pool.keep": "compaction",
+    "give_birth": "births",
+    "move_agents": "movement",
+}
+
+
+def timed(method, timings, phase):
+    def wrapper(*args, **kwargs):
+        start = time.perf_counter()
+        try:
+            return method(*args, **kwargs)
+        finally:
+            timings[phase] = timings.get(phase, 0.0) + time.perf_counter() - start
+    return wrapper
+
+
+def peak_rss_mb():
+    # ru_maxrss is in kilobytes on Linux and bytes on macOS
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak / (1024 * 1024) if sys.platform == "darwin" else peak / 1024
+
+
+def map_pixels(population, density):
+    return max(MIN_PIXELS, math.ceil(math.sqrt(population / density)))
+
+
+def populate(simmap, population, carnivore_fraction, carcass_fraction):
+    # Replace the Map's default agents with population agents, split evenly across the
+    # species of each diet, then turn carcass_fraction of them into carcasses of every age
+    from ecosystem_simulation import species_ref
+    from agent_pool import AgentPool
+    from lifecycle import Calendar
+
+    simmap.pool = AgentPool(population)
+    simmap.calendar = Calendar(simmap.tick)
+    simmap.births = []
+    simmap.expiries = Calendar(simmap.tick)
+    simmap.tombstones = 0
+    carnivores = round(population * carnivore_fraction)
+    for diet, number in (("carnivore", carnivores), ("herbivore", population - carnivores)):
+        names = [name for name in species_ref if species_ref[name]["diet"] == diet]
+        for i, name in enumerate(names):
+            share = number // len(names) + (i < number % len(names))
+            if share:
+                simmap.spawn_agents(name, share)
+
+    pool = simmap.pool
+    carcasses = simmap.rng.choice(len(pool), size=round(len(pool) * carcass_fraction), replace=False)
+    lifetimes = simmap.expiry_ticks(carcasses) - pool.death_tick[carcasses]
+    pool.alive[carcasses] = False
+    pool.death_tick[carcasses] = simmap.tick - simmap.rng.integers(0, lifetimes)
+    simmap.schedule_expiry(carcasses)
+
+
+def benchmark(config):
+    from ecosystem_simulation import Map
+
+    population = config["population"]
+    start = time.perf_counter()
+    simmap = Map(config["seed"], terrain_backend=config["terrain_backend"], pixels=config["pixels"],
+                 chunk_size=config["chunk_size"])
+    populate(simmap, population, config["carnivore_fraction"], config["carcass_fraction"])
+    build_seconds = time.perf_counter() - start
+
+    for _ in range(config["warmup_ticks"]):
+        simmap.simulate_agents()
+    # Wrap the phases on the instance, so the calls made by simulate_agents go through them
+    timings = {}
+    for name, phase in PHASES.items():
+        owner = simmap.pool if name.startswith("pool.") else simmap
+        method_name = name.split(".")[-1]
+        setattr(owner, method_name, timed(getattr(owner, method_name), timings, phase))
+
+    alive_before = int(np.count_nonzero(simmap.pool.alive[:len(simmap.pool)]))
+    start = time.perf_counter()
+    for _ in range(config["ticks"]):
+        simmap.simulate_agents()
+    elapsed = time.perf_counter() - start
+    pool = simmap.pool
+    alive = int(np.count_nonzero(pool.alive[:len(pool)]))
+    carcasses = int(np.count_nonzero(~pool.alive[:len(pool)] & ~pool.removed[:len(pool)]))
+
+    return dict(config, **{
+        "build_seconds": build_seconds,
+        "ticks_per_second": config["ticks"] / elapsed,
+        "seconds_per_tick": {phase: timings.get(phase, 0.0) / config["ticks"] for phase in PHASES.values()},
+        "alive_before": alive_before,
+        "alive_after": alive,
+        "carcasses_after": carcasses,
+        "peak_rss_mb": peak_rss_mb(),
+    })
+
+
+def run(populations, carnivore_fractions, carcass_fractions, args):
+    results = []
+    # A fresh spawned process per configuration keeps each peak RSS separate. SDL swallows
+    # SIGTERM, so workers have to be shut down cleanly rather than terminated as Pool does.
+    context = multiprocessing.get_context("spawn")
+    for population in populations:
+        for carnivore_fraction in carnivore_fractions:
+            for carcass_fraction in carcass_fractions:
+                config = {
+                    "population": population,
+                    "carnivore_fraction": carnivore_fraction,
+                    "carcass_fraction": carcass_fraction,
+                    "pixels": args.pixels or map_pixels(population, args.density),
+                    "chunk_size": args.chunk_size,
+                    "terrain_backend": args.terrain_backend,
+                    "seed": args.seed,
+                    "ticks": args.ticks,
+                    "warmup_ticks": args.warmup_ticks,
+                }
+                with ProcessPoolExecutor(1, mp_context=context) as executor:
+                    result = executor.submit(benchmark, config).result()
+                phases = ", ".join(f"{phase} {seconds * 1e3:.1f}ms" for phase, seconds in result["seconds_per_tick"].items())
+                print(f"{population:8d} agents, {carnivore_fraction:.2f} carnivores, {carcass_fraction:.2f} carcasses, "
+                      f"{result['pixels']}px: {result['ticks_per_second']:.2f} ticks/s, "
+                      f"peak {result['peak_rss_mb']:.0f}MB ({phases})")
+                results.append(result)
+    return results
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark the ecosystem tick across population sizes")
+    parser.add_argument("--populations", nargs="+", type=int, default=POPULATIONS)
+    parser.add_argument("--carnivore-fractions", nargs="+", type=float, default=CARNIVORE_FRACTIONS,
+                        help="Share of the population that is carnivores")
+    parser.add_argument("--carcass-fractions", nargs="+", type=float, default=CARCASS_FRACTIONS,
+                        help="Share of the population that starts as carcasses")
+    parser.add_argument("--pixels", type=int, default=None, help="Fixed map size; by default sized to the population")
+    parser.add_argument("--density", type=float, default=DENSITY, help="Agents per pixel when sizing the map")
+    parser.add_argument("--chunk-size", type=int, default=None, help="Generate terrain and resources per chunk")
+    parser.add_argument("--terrain-backend", choices=["noise", "numpy"], default="numpy")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--ticks", type=int, default=TICKS)
+    parser.add_argument("--warmup-ticks", type=int, default=WARMUP_TICKS)
+    parser.add_argument("--output", default="benchmark_population.json")
+    args = parser.parse_args()
+
+    results = run(args.populations, args.carnivore_fractions, args.carcass_fractions, args)
+    report = {
+        "created": datetime.now(timezone.utc).isoformat(),
+        "python": platform.python_version(),
+        "numpy": np.__version__,
+        "platform": platform.platform(),
+        "results": results,
+    }
+    with open(args.output, "w") as f:
+        json.dump(report, f, indent=2)
+    print(f"Wrote {len(results)} results to {args.output}")
@@ -0,0 +1,153 @@
+# benchmark_world.py
+# Times each world-construction phase (terrain, region raster, land index, resources,
+# agents), the first and steady-state Map.draw and spawn_location, across map sizes
+# and seeds for every Map variant in the repo. Results are written as JSON so runs
+# with different terrain backends or commits can be diffed.
+import os
+os.environ.setdefault("SDL_VIDEODRIVER", "dummy")
+os.environ.setdefault("SDL_AUDIODRIVER", "dummy")
+
+import argparse
+import importlib.util
+import json
+import platform
+import sys
+import time
+from datetime import datetime, timezone
+import numpy as np
+import pygame
+
+ROOT = os.path.dirname(os.path.abspath(__file__))
+# Variant name -> module file defining its Map class
+VARIANTS = {
+    "ecosystem_simulation": "ecosystem_simulation.py",
+    "custom_env": "custom_env.py",
+    "co-learning": "co-learning/map.py",
+    "single-agent-rl": "single-agent-rl/single_agent_env.py",
+    "single-agent-rl-map": "single-agent-rl/map.py",
+    "multi-agent-single-env": "multi-agent-single-env/custom_env_multi_agent.py",
+}
+# Map methods timed during construction; nested phases are also counted in their caller
+PHASES = ["generate_world", "generate_region_grid", "load_terrain", "build_land_index",
+          "init_resource_generation", "init_agents"]
+SIZES = [100, 400, 1600, 4096]
+SEEDS = [0, 1, 2]
+SPAWN_CALLS = 1000
+
+
+def load_variant(name):
+    # The variants share module names (map, agent, perlin, ...), so each one is imported
+    # from its own directory with those modules cleared first
+    path = os.path.join(ROOT, VARIANTS[name])
+    directory = os.path.dirname(path)
+    for module_name in ("map", "agent", "resource_block", "perlin", "terrain_pyramid",
+                        "terrain_cache", "seed_library", "spatial_hash", "movement", "agent_slots", "lifecycle",
+                        "species_table", "carcass_decay"):
+        sys.modules.pop(module_name, None)
+    sys.path.insert(0, directory)
+    try:
+        spec = importlib.util.spec_from_file_location(f"benchmark_{name.replace('-', '_')}", path)
+        module = importlib.util.module_from_spec(spec)
+        spec.loader.exec_module(module)
+    finally:
+        sys.path.remove(directory)
+    return module
+
+
+def timed(method, timings, phase):
+    def wrapper(*args, **kwargs):
+        start = time.perf_counter()
+        try:
+            return method(*args, **kwargs)
+        finally:
+            timings[phase] = timings.get(phase, 0.0) + time.perf_counter() - start
+    return wrapper
+
+
+def build_map(map_class, seed, pixels, terrain_backend, resource_cell_size):
+    # Wrap the construction phases on the class for the duration of one Map()
+    timings = {}
+    originals = {phase: map_class.__dict__[phase] for phase in PHASES if phase in map_class.__dict__}
+    for phase, method in originals.items():
+        setattr(map_class, phase, timed(method, timings, phase))
+    try:
+        start = time.perf_counter()
+        simmap = map_class(seed, terrain_backend=terrain_backend, pixels=pixels, resource_cell_size=resource_cell_size)
+        timings["init_total"] = time.perf_counter() - start
+    finally:
+        for phase, method in originals.items():
+            setattr(map_class, phase, method)
+    return simmap, timings
+
+
+def draw(simmap, screen):
+    # ecosystem_simulation's Map draws to its module-level screen
+    if screen is None:
+        return simmap.draw()
+    return simmap.draw(screen)
+
+
+def benchmark(name, module, pixels, seed, terrain_backend, resource_cell_size, spawn_calls):
+    simmap, timings = build_map(module.Map, seed, pixels, terrain_backend, resource_cell_size)
+    screen = None if name == "ecosystem_simulation" else pygame.Surface((pixels, pixels))
+
+    start = time.perf_counter()
+    draw(simmap, screen)
+    timings["draw_first"] = time.perf_counter() - start
+    start = time.perf_counter()
+    draw(simmap, screen)
+    timings["draw"] = time.perf_counter() - start
+
+    start = time.perf_counter()
+    for _ in range(spawn_calls):
+        simmap.spawn_location()
+    timings["spawn_location"] = (time.perf_counter() - start) / spawn_calls
+
+    return {
+        "variant": name,
+        "pixels": pixels,
+        "seed": seed,
+        "terrain_backend": terrain_backend,
+        "resource_cell_size": resource_cell_size,
+        "agents": len(simmap.agents),
+        "seconds": timings,
+    }
+
+
+def run(variants, sizes, seeds, terrain_backend, resource_cell_size, spawn_calls):
+    pygame.init()
+    results = []
+    for name in variants:
+        module = load_variant(name)
+        for pixels in sizes:
+            for seed in seeds:
+                result = benchmark(name, module, pixels, seed, terrain_backend, resource_cell_size, spawn_calls)
+                seconds = result["seconds"]
+                print(f"{name:24s} {pixels:5d}px seed {seed}: init {seconds['init_total']:.3f}s, "
+                      f"draw {seconds['draw_first']:.4f}s, spawn {seconds['spawn_location'] * 1e6:.1f}us")
+                results.append(result)
+    return results
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark world construction for every Map variant")
+    parser.add_argument("--variants", nargs="+", choices=list(VARIANTS), default=list(VARIANTS))
+    parser.add_argument("--sizes", nargs="+", type=int, default=SIZES, help="Map sizes in pixels")
+    parser.add_argument("--seeds", nargs="+", type=int, default=SEEDS)
+    parser.add_argument("--terrain-backend", choices=["noise", "numpy"], default="numpy")
+    parser.add_argument("--resource-cell-size", type=int, default=1, help="Pixels per side of one resource cell")
+    parser.add_argument("--spawn-calls", type=int, default=SPAWN_CALLS, help="spawn_location calls to average over")
+    parser.add_argument("--output", default="benchmark_world.json")
+    args = parser.parse_args()
+
+    results = run(args.variants, args.sizes, args.seeds, args.terrain_backend, args.resource_cell_size, args.spawn_calls)
+    report = {
+        "created": datetime.now(timezone.utc).isoformat(),
+        "python": platform.python_version(),
+        "numpy": np.__version__,
+        "platform": platform.platform(),
+        "results": results,
+    }
+    with open(args.output, "w") as f:
+        json.dump(report, f, indent=2)
+    print(f"Wrote {len(results)} results to {args.output}")
@@ -0,0 +1,178 @@
+# chunked_world.py
+# Tiled terrain for worlds far larger than the screen. Terrain, region and resource
+# chunks are generated the first time an agent or the renderer touches them, and the
+# least recently used chunks are evicted once the memory budget is exceeded. Terrain is
+# regenerated from the seed on reload; grazed resource cells are spilled on eviction and
+# restored with the regrowth they missed, so eviction never changes the simulation.
+from collections import OrderedDict
+import numpy as np
+from resource_block import ResourceBlock, DepletedCells, share
+
+CHUNK_SIZE = 64
+MEMORY_BUDGET = 256 * 1024 * 1024  # Bytes of chunk data kept resident
+
+
+class Chunk:
+    def __init__(self, world, region_grid, land_mask, resources, regen_rate, cap):
+        self.world = world
+        self.region_grid = region_grid
+        self.land_mask = land_mask
+        self.resources = resources
+        self.regen_rate = regen_rate
+        self.cap = cap
+        self.depleted = DepletedCells(resources.shape)
+        self.nbytes = sum(array.nbytes for array in (world, region_grid, land_mask, resources, regen_rate, cap,
+                                                     self.depleted.member))
+
+
+class ChunkedWorld:
+    def __init__(self, simmap, chunk_size=CHUNK_SIZE, memory_budget=MEMORY_BUDGET):
+        self.simmap = simmap
+        self.chunk_size = chunk_size
+        self.memory_budget = memory_budget
+        self.chunks = OrderedDict()
+        self.resident_bytes = 0
+        self.generated = 0
+        self.evicted = 0
+        self.regrown = 0  # regrow() calls so far, to catch spilled cells up on reload
+        self.spilled = {}  # (cx, cy) -> (depleted flat cells, their resources, regrown at eviction)
+
+    def get_chunk(self, cx, cy):
+        chunk = self.chunks.get((cx, cy))
+        if chunk is not None:
+            self.chunks.move_to_end((cx, cy))
+            return chunk
+
+        chunk = self.generate_chunk(cx, cy)
+        self.restore(chunk, self.spilled.pop((cx, cy), None))
+        self.chunks[(cx, cy)] = chunk
+        self.resident_bytes += chunk.nbytes
+        self.generated += 1
+        self.evict()
+        return chunk
+
+    def generate_chunk(self, cx, cy):
+        x0, y0 = cx * self.chunk_size, cy * self.chunk_size
+        x1 = min(x0 + self.chunk_size, self.simmap.pixels)
+        y1 = min(y0 + self.chunk_size, self.simmap.pixels)
+        world = self.simmap.generate_world(x0, x1, y0, y1)
+        region_grid = self.simmap.generate_region_grid(world)
+
+        # Each chunk draws from its own stream so it regenerates identically after eviction
+        rng = np.random.default_rng((self.simmap.seed, cx, cy))
+        cell_size = self.simmap.resource_cell_size
+        resource_shape = (world.shape[0] // cell_size, world.shape[1] // cell_size)
+        regen_rate = rng.random(resource_shape) * self.simmap.regen_multiplier
+        cap = np.full(resource_shape, self.simmap.resource_cap, dtype=np.float64)
+        return Chunk(world, region_grid, region_grid != self.simmap.ocean_id, cap.copy(), regen_rate, cap)
+
+    def evict(self):
+        # Never evict the chunk that was just touched
+        while self.resident_bytes > self.memory_budget and len(self.chunks) > 1:
+            key, chunk = self.chunks.popitem(last=False)
+            self.spill(key, chunk)
+            self.resident_bytes -= chunk.nbytes
+            self.evicted += 1
+
+    def spill(self, key, chunk):
+        # Only the cells that may be below cap differ from a freshly generated chunk
+        cells = chunk.depleted.cells
+        below_cap = chunk.resources.reshape(-1)[cells] < chunk.cap.reshape(-1)[cells]
+        if np.any(below_cap):
+            cells = cells[below_cap]
+            self.spilled[key] = (cells, chunk.resources.reshape(-1)[cells], self.regrown)
+
+    def restore(self, chunk, spilled):
+        # Put spilled cells back with every regrow() they missed; regrowth is a clamped
+        # add per tick, so catching up in one step gives the same values up to rounding
+        if spilled is None:
+            return
+        cells, resources, regrown = spilled
+        elapsed = self.regrown - regrown
+        flat = chunk.resources.reshape(-1)
+        flat[cells] = np.minimum(resources + chunk.regen_rate.reshape(-1)[cells] * elapsed, chunk.cap.reshape(-1)[cells])
+        chunk.depleted.add(cells[flat[cells] < chunk.cap.reshape(-1)[cells]])
+
+    def by_chunk(self, x, y, size):
+        # Group coordinates by the chunk of side size they fall in, with one sort; yields
+        # (cx, cy, indices into x and y) per chunk touched
+        cx, cy = x // size, y // size
+        keys = cx * (int(cy.max()) + 1) + cy if len(cy) else cy
+        order = np.argsort(keys, kind="stable")
+        starts = np.flatnonzero(np.diff(keys[order], prepend=-1))
+        for start, end in zip(starts.tolist(), np.append(starts[1:], len(order)).tolist()):
+            members = order[start:end]
+            yield int(cx[members[0]]), int(cy[members[0]]), members
+
+    def locate(self, x, y):
+        cx, lx = divmod(x, self.chunk_size)
+        cy, ly = divmod(y, self.chunk_size)
+        return self.get_chunk(cx, cy), lx, ly
+
+    def get_noise_value(self, x, y):
+        chunk, lx, ly = self.locate(x, y)
+        return chunk.world[lx, ly]
+
+    def get_region_id(self, x, y):
+        chunk, lx, ly = self.locate(x, y)
+        return chunk.region_grid[lx, ly]
+
+    def is_land(self, x, y):
+        chunk, lx, ly = self.locate(x, y)
+        return chunk.land_mask[lx, ly]
+
+    def land_at(self, x, y):
+        # is_land for arrays of pixel coordinates, one fancy-indexed lookup per chunk
+        land = np.zeros(len(x), dtype=bool)
+        for cx, cy, members in self.by_chunk(x, y, self.chunk_size):
+            chunk = self.get_chunk(cx, cy)
+            land[members] = chunk.land_mask[x[members] - cx * self.chunk_size, y[members] - cy * self.chunk_size]
+        return land
+
+    def resource_block(self, x, y):
+        chunk, lx, ly = self.locate(x, y)
+        cell_size = self.simmap.resource_cell_size
+        return ResourceBlock(chunk, x, y, (lx // cell_size, ly // cell_size))
+
+    def regrow(self):
+        # Only resident chunks regrow; spilled chunks catch up when they are restored
+        self.regrown += 1
+        return sum(chunk.depleted.regrow(chunk) for chunk in self.chunks.values())
+
+    def graze(self, cells, demand):
+        # cells are resource-grid indices, chunk_cells of which fit along each chunk side
+        # Contention is resolved for every chunk in one share() call, so the per-chunk work
+        # is just reading and writing back the cells grazed there
+        grants = np.zeros(len(cells), dtype=np.float64)
+        if len(cells) == 0:
+            return grants
+        chunk_cells = self.chunk_size // self.simmap.resource_cell_size
+        local = cells % chunk_cells
+        available = np.empty(len(cells), dtype=np.float64)
+        for cx, cy, members in self.by_chunk(cells[:, 0], cells[:, 1], chunk_cells):
+            available[members] = self.get_chunk(cx, cy).resources[local[members, 0], local[members, 1]]
+
+        order, starts, sorted_grants = share(cells[:, 0] * (int(cells[:, 1].max()) + 1) + cells[:, 1], available, demand)
+        grants[order] = sorted_grants
+        eaten = np.add.reduceat(sorted_grants, starts)
+        firsts = order[starts]  # One grazer on each cell, to locate it
+        # Chunks are looked up again, as an eviction during the reads may have spilled one
+        for cx, cy, members in self.by_chunk(cells[firsts, 0], cells[firsts, 1], chunk_cells):
+            chunk = self.get_chunk(cx, cy)
+            lx, ly = local[firsts[members], 0], local[firsts[members], 1]
+            chunk.resources[lx, ly] -= eaten[members]
+            grazed = eaten[members] > 0
+            chunk.depleted.add(np.ravel_multi_index((lx[grazed], ly[grazed]), chunk.resources.shape))
+        return grants
+
+    def get_region_window(self, x0, x1, y0, y1):
+        region_ids = np.empty((x1 - x0, y1 - y0), dtype=np.uint8)
+        size = self.chunk_size
+        for cx in range(x0 // size, (x1 - 1) // size + 1):
+            for cy in range(y0 // size, (y1 - 1) // size + 1):
+                chunk = self.get_chunk(cx, cy)
+                sx0, sx1 = max(x0, cx * size), min(x1, (cx + 1) * size)
+                sy0, sy1 = max(y0, cy * size), min(y1, (cy + 1) * size)
+                region_ids[sx0 - x0:sx1 - x0, sy0 - y0:sy1 - y0] = \
+                    chunk.region_grid[sx0 - cx * size:sx1 - cx * size, sy0 - cy * size:sy1 - cy * size]
+        return region_ids
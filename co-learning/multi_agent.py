@@ -17,8 +17,8 @@ class MultiAgentEnv(gym.Env):
         super(MultiAgentEnv, self).__init__()
         self.seed = random.randint(0, 1000000)
         self.simmap = Map(self.seed)
-        self.carnivores = [agent for agent in self.simmap.agents if agent.species['diet'] == 'carnivore']
-        self.herbivores = [agent for agent in self.simmap.agents if agent.species['diet'] == 'herbivore']
+        self.carnivores = list(self.simmap.agents.with_diet('carnivore'))
+        self.herbivores = list(self.simmap.agents.with_diet('herbivore'))
         assert len(self.carnivores) >= 1, "There should be at least one carnivore"
 
         self.agent_type = agent_type
@@ -33,8 +33,8 @@ class MultiAgentEnv(gym.Env):
 
     def reset(self, seed=None, options=None):
         self.simmap = Map(self.seed)
-        self.carnivores = [agent for agent in self.simmap.agents if agent.species['diet'] == 'carnivore']
-        self.herbivores = [agent for agent in self.simmap.agents if agent.species['diet'] == 'herbivore']
+        self.carnivores = list(self.simmap.agents.with_diet('carnivore'))
+        self.herbivores = list(self.simmap.agents.with_diet('herbivore'))
         
         assert len(self.carnivores) >= 1, "There should be at least one carnivore"
         self.current_step = 0
@@ -46,7 +46,7 @@ class MultiAgentEnv(gym.Env):
         if self.agent_type == 'carnivore':
             action_carnivore = action
             # loop over all herbivores and predict their actions
-            self.herbivores = [agent for agent in self.simmap.agents if agent.species['diet'] == 'herbivore']
+            self.herbivores = list(self.simmap.agents.with_diet('herbivore'))
             herbivore_model_path = "dqn_herbivore_agent_co_learning"
             if os.path.exists(herbivore_model_path + ".zip"):
                 herbivore_env = create_herbivore_env()
@@ -73,12 +73,12 @@ class MultiAgentEnv(gym.Env):
         info = {}
 
         # Check if all herbivores are dead
-        if all(not agent.alive for agent in self.simmap.agents if agent.species == 'herbivore'):
+        if all(not agent.alive for agent in self.simmap.agents.with_diet('herbivore')):
             terminated = True
             reward_carnivore += 100  # Large reward for carnivores if they win
 
         # Check if the carnivore is dead
-        if all(not agent.alive for agent in self.simmap.agents if agent.species == 'carnivore'):
+        if all(not agent.alive for agent in self.simmap.agents.with_diet('carnivore')):
             terminated = True
             reward_carnivore -= 100  # Large penalty for carnivores if they lose
 
@@ -95,13 +95,11 @@ class MultiAgentEnv(gym.Env):
         return tiles
 
     def calculate_carnivore_reward(self):
-        reward = 0
-        for carnivore in self.carnivores:
-            nearby_agents = carnivore.find_nearby_agents(10)
-            for nearby_agent in nearby_agents:
-                if nearby_agent.species['diet'] == 'herbivore' and not nearby_agent.alive:
-                    reward += 10  # Positive reward for each herbivore hunted by carnivores
-        return reward
+        # +10 for each herbivore carcass within 10 pixels of each carnivore, from one batched query
+        _, nearby, _ = self.simmap.query_radius([carnivore.location for carnivore in self.carnivores], 10)
+        hunted = np.array([agent.params.is_herbivore and not agent.alive and agent.meat_calories > 0
+                           for agent in self.simmap.agents], dtype=bool)
+        return 10 * int(np.count_nonzero(hunted[nearby]))
 
     def calculate_herbivore_reward(self):
         reward = 0
@@ -128,19 +126,20 @@ class MultiAgentEnv(gym.Env):
         elif action == 7:
             agent.move_down_right()
 
-        if agent.species['diet'] == 'carnivore':
+        if not agent.params.is_herbivore:
             self.check_and_eat(agent)
 
     def check_and_eat(self, agent):
-        for herbivore in self.simmap.agents:
-            if herbivore.species['diet'] == 'herbivore' and herbivore.alive:
+        # Only agents in the carnivore's own spatial hash bucket can share its location
+        for herbivore in self.simmap.spatial_hash.candidates(agent.location, 0):
+            if herbivore.params.is_herbivore and herbivore.alive:
                 if herbivore.location == agent.location:
                     herbivore.alive = False  # The herbivore is eaten
 
     def render(self, mode='human'):
-        self.simmap.draw(self.screen)
-        self.simmap.draw_agents(self.screen)
-        pygame.display.flip()
+        dirty_rects = self.simmap.draw(self.screen, incremental=(mode == 'human'))
+        dirty_rects += self.simmap.draw_agents(self.screen)
+        pygame.display.update(dirty_rects)
 
         if mode == 'rgb_array':
             return pygame.surfarray.array3d(self.screen).swapaxes(0, 1)
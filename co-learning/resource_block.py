@@ -1,7 +1,26 @@
+RESOURCE_CAP = 10000  # Maximum resources a cell can hold
+
+
 class ResourceBlock:
-    def __init__(self, x, y, regen_rate):
+    # Per-cell view onto a resources/regen_rate/cap grid owner (a Map or a world chunk)
+    def __init__(self, grids, x, y, cell=None):
+        self.grids = grids
         self.x = x
         self.y = y
-        self.cap = 10000
-        self.resources = self.cap
-        self.regen_rate = regen_rate
\ No newline at end of file
+        self.cell = (x, y) if cell is None else cell
+
+    @property
+    def cap(self):
+        return self.grids.cap[self.cell]
+
+    @property
+    def resources(self):
+        return self.grids.resources[self.cell]
+
+    @resources.setter
+    def resources(self, value):
+        self.grids.resources[self.cell] = value
+
+    @property
+    def regen_rate(self):
+        return self.grids.regen_rate[self.cell]
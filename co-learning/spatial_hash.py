@@ -0,0 +1,139 @@
+# spatial_hash.py
+# Uniform-grid spatial indexes for radius queries. Buckets are cell_size pixels wide,
+# with cell_size matched to the usual query radius, so a query only looks at the
+# neighbouring buckets instead of scanning every agent. Candidates come back in the
+# order the Map's agents iterate in, so callers that apply their usual distance test
+# get exactly the results of a brute-force scan.
+import math
+from operator import attrgetter
+import numpy as np
+
+CELL_SIZE = 10  # Pixels; the radius carnivores hunt within
+
+
+class SpatialHash:
+    # Incrementally updated index over Agent objects. Agents register themselves when
+    # their location is set and are removed when they leave the Map's agent list.
+    def __init__(self, pixels, cell_size=CELL_SIZE):
+        self.cell_size = cell_size
+        self.cells_per_side = -(-pixels // cell_size)
+        self.buckets = {}
+        self.cells = {}  # agent -> bucket key
+
+    def cell_of(self, location):
+        return (math.floor(location[0] / self.cell_size), math.floor(location[1] / self.cell_size))
+
+    def place(self, agent, location):
+        cell = self.cell_of(location)
+        old_cell = self.cells.get(agent)
+        if old_cell == cell:
+            return
+        if old_cell is not None:
+            self.buckets[old_cell].remove(agent)
+        self.cells[agent] = cell
+        self.buckets.setdefault(cell, []).append(agent)
+
+    def remove(self, agent):
+        cell = self.cells.pop(agent, None)
+        if cell is not None:
+            self.buckets[cell].remove(agent)
+
+    def candidates(self, location, radius):
+        # Every agent that could be within radius of location, in AgentSlots slot order
+        cx, cy = self.cell_of(location)
+        reach = math.ceil(radius / self.cell_size)
+        found = []
+        for x in range(cx - reach, cx + reach + 1):
+            for y in range(cy - reach, cy + reach + 1):
+                found.extend(self.buckets.get((x, y), ()))
+        found.sort(key=attrgetter("slot"))
+        return found
+
+    def ring(self, cx, cy, reach):
+        # Bucket keys at Chebyshev distance reach from (cx, cy)
+        if reach == 0:
+            yield cx, cy
+            return
+        for x in range(cx - reach, cx + reach + 1):
+            yield x, cy - reach
+            yield x, cy + reach
+        for y in range(cy - reach + 1, cy + reach):
+            yield cx - reach, y
+            yield cx + reach, y
+
+    def nearest_distance(self, location, accept, default):
+        # Distance to the closest agent passing accept(), searching outward ring by ring
+        cx, cy = self.cell_of(location)
+        best = default
+        for reach in range(self.cells_per_side + max(abs(cx), abs(cy)) + 1):
+            for cell in self.ring(cx, cy, reach):
+                for agent in self.buckets.get(cell, ()):
+                    if accept(agent):
+                        dist = math.sqrt((location[0] - agent.location[0])**2 + (location[1] - agent.location[1])**2)
+                        best = min(best, dist)
+            # Anything in a farther ring is at least reach * cell_size away
+            if best <= reach * self.cell_size:
+                break
+        return best
+
+
+class GridIndex:
+    # Index over position arrays, rebuilt with one sort whenever the positions change.
+    # Only occupied buckets cost memory, so it works for chunked worlds of any size.
+    def __init__(self, cell_size=CELL_SIZE):
+        self.cell_size = cell_size
+        self.order = np.empty(0, dtype=np.int64)
+        self.keys = np.empty(0, dtype=np.int64)
+        self.x = self.y = np.empty(0, dtype=np.float64)
+        self.stride = 1
+
+    def build(self, x, y):
+        # Bucket key cx * stride + cy; order lists point indices sorted by key, stably
+        cx = (x // self.cell_size).astype(np.int64)
+        cy = (y // self.cell_size).astype(np.int64)
+        self.stride = int(cy.max()) + 1 if len(cy) else 1
+        keys = cx * self.stride + cy
+        self.order = np.argsort(keys, kind="stable")
+        self.keys = keys[self.order]
+        self.x, self.y = x, y
+
+    def query_radius(self, x, y, radius):
+        # Neighbours within radius of every query point (x[q], y[q]) at once, in CSR form:
+        # query q's neighbours are indices[offsets[q]:offsets[q + 1]], in ascending index
+        # order, with matching distances.
+        x = np.asarray(x, dtype=np.float64)
+        y = np.asarray(y, dtype=np.float64)
+        reach = math.ceil(radius / self.cell_size)
+        span = 2 * reach + 1
+        cx = (x // self.cell_size).astype(np.int64)
+        cy = (y // self.cell_size).astype(np.int64)
+
+        # One contiguous key range per (query, bucket row) pair
+        rows = (cx[:, None] + np.arange(-reach, reach + 1)) * self.stride
+        first_y = np.maximum(cy - reach, 0)[:, None]
+        last_y = np.minimum(cy + reach, self.stride - 1)[:, None]
+        valid = (rows >= 0) & (first_y <= last_y)
+        starts = np.where(valid, np.searchsorted(self.keys, rows + first_y), 0).ravel()
+        ends = np.where(valid, np.searchsorted(self.keys, rows + last_y + 1), 0).ravel()
+
+        # Expand the ranges into (query, candidate) pairs without a Python loop
+        lengths = ends - starts
+        queries = np.repeat(np.arange(len(x)).repeat(span), lengths)
+        range_offsets = np.repeat(np.cumsum(lengths) - lengths, lengths)
+        candidates = self.order[np.repeat(starts, lengths) + np.arange(lengths.sum()) - range_offsets]
+
+        distances = np.sqrt((x[queries] - self.x[candidates]) ** 2 + (y[queries] - self.y[candidates]) ** 2)
+        within = distances <= radius
+        queries, candidates, distances = queries[within], candidates[within], distances[within]
+        order = np.lexsort((candidates, queries))
+        offsets = np.zeros(len(x) + 1, dtype=np.int64)
+        offsets[1:] = np.cumsum(np.bincount(queries, minlength=len(x)))
+        return offsets, candidates[order], distances[order]
+
+
+def select_pairs(offsets, keep, *columns):
+    # Drop the CSR entries where keep is False: returns the new offsets, then each column filtered
+    owners = np.repeat(np.arange(len(offsets) - 1), np.diff(offsets))
+    selected = np.zeros(len(offsets), dtype=np.int64)
+    selected[1:] = np.cumsum(np.bincount(owners[keep], minlength=len(offsets) - 1))
+    return (selected,) + tuple(column[keep] for column in columns)
@@ -0,0 +1,55 @@
+# terrain_pyramid.py
+# Mipmap pyramid of the terrain color raster. Level 0 is the full-resolution
+# (pixels, pixels, 3) image and each further level halves both sides with a 2x2
+# box filter, so observation builders can take a coarse global view or a fine
+# local crop by slicing instead of resampling every step.
+import numpy as np
+
+
+def downsample(image):
+    # Odd sides repeat their last row/column so every output texel averages 2x2 inputs
+    width, height = image.shape[:2]
+    if width % 2 or height % 2:
+        image = np.pad(image, ((0, width % 2), (0, height % 2), (0, 0)), mode="edge")
+    total = image[0::2, 0::2].astype(np.uint16) + image[1::2, 0::2] + image[0::2, 1::2] + image[1::2, 1::2]
+    return ((total + 2) // 4).astype(np.uint8)
+
+
+class TerrainPyramid:
+    def __init__(self, image, min_size=1):
+        self.levels = [np.ascontiguousarray(image, dtype=np.uint8)]
+        while min(self.levels[-1].shape[:2]) > min_size:
+            self.levels.append(downsample(self.levels[-1]))
+
+    def __len__(self):
+        return len(self.levels)
+
+    def level(self, level):
+        return self.levels[level]
+
+    def level_for(self, size):
+        # Finest level whose longest side fits in size x size
+        for level, image in enumerate(self.levels):
+            if max(image.shape[:2]) <= size:
+                return level
+        return len(self.levels) - 1
+
+    def global_view(self, size):
+        # Whole map at the finest level that fits, padded with black to size x size
+        image = self.levels[self.level_for(size)]
+        view = np.zeros((size, size, 3), dtype=np.uint8)
+        view[:image.shape[0], :image.shape[1]] = image
+        return view
+
+    def local_view(self, x, y, size, level=0):
+        # size x size window centred on the level-0 pixel (x, y); out of bounds is black
+        image = self.levels[level]
+        cx, cy = int(x) >> level, int(y) >> level
+        half = size // 2
+        view = np.zeros((size, size, 3), dtype=np.uint8)
+
+        x0, x1 = max(cx - half, 0), min(cx - half + size, image.shape[0])
+        y0, y1 = max(cy - half, 0), min(cy - half + size, image.shape[1])
+        if x0 < x1 and y0 < y1:
+            view[x0 - cx + half:x1 - cx + half, y0 - cy + half:y1 - cy + half] = image[x0:x1, y0:y1]
+        return view
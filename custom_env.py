@@ -2,7 +2,16 @@
 import pygame
 import random
 import noise
+import perlin
+from terrain_pyramid import TerrainPyramid
+from spatial_hash import SpatialHash
+from agent_slots import AgentSlots
+from species_table import SpeciesTable
+from carcass_decay import CARCASS_THRESHOLD, decayed, expiry_tick
+from movement import random_walk
+from lifecycle import Calendar, AGE_DEATH, STARVATION, MATURITY, BREEDING, BREEDING_CHANCE, starvation_tick
 import math
+import heapq
 import numpy as np
 import gym
 from gym import spaces
@@ -12,12 +21,12 @@ pygame.init()
 
 # Define constants
 WIDTH, HEIGHT = 400, 400
+RESOURCE_CAP = 10000  # Maximum resources a cell can hold
 WHITE = (255, 255, 255)
 BLACK = (0, 0, 0)
 RED = (255, 0, 0)
 GREEN = (0, 255, 0)
 BLUE = (0, 0, 255)
-DECAY_RATE = 0.01  # Rate at which dead bodies decay
 
 # Define regions
 regions = {
@@ -47,30 +56,66 @@ regions = {
     }
 }
 
+REGION_NAMES = list(regions)
+REGION_COLORS = np.array([regions[region]["color"] for region in REGION_NAMES], dtype=np.uint8)
+OCEAN_ID = REGION_NAMES.index("ocean")
+
 # Define species reference
 species_ref = {
     "wolf": {"common_name": "wolf", "diet": "carnivore", "adult_body_mass": 31, "age_at_first_birth": 547, "max_longevity": 354, "home_range": 159.86},
     "moose": {"common_name": "moose", "diet": "herbivore", "adult_body_mass": 461, "age_at_first_birth": 1216, "max_longevity": 324, "home_range": 71.75},
     "beaver": {"common_name": "beaver", "diet": "herbivore", "adult_body_mass": 18, "age_at_first_birth": 220, "max_longevity": 180, "home_range": 5.5}
 }
+SPECIES = SpeciesTable(species_ref)  # Interned species ids and their parameter columns
 
 class Map:
-    def __init__(self, seed):
-        self.size = 200
-        self.pixels = 400
+    def __init__(self, seed, terrain_backend="noise", pixels=WIDTH, resource_cell_size=1, carcass_threshold=CARCASS_THRESHOLD):
+        self.pixels = pixels
+        if self.pixels % resource_cell_size:
+            raise ValueError(f"resource_cell_size {resource_cell_size} does not divide the map size {self.pixels}")
+        self.resource_cell_size = resource_cell_size  # Pixels per side of one resource cell
+        self.size = self.pixels // resource_cell_size  # Resource cells per side
         self.scale = self.pixels / self.size
         self.noise_scale = 3.0
         self.octaves = 6
         self.persistence = 0.5
         self.lacunarity = 2.0
+        self.terrain_backend = terrain_backend  # "noise" (per-pixel pnoise2) or "numpy" (perlin.py)
         self.regen_multiplier = 1500
-        self.agents = []
+        self.agents = AgentSlots()
+        self.species_table = SPECIES
+        self.tick = 0
+        self.calendar = Calendar()  # Lifecycle deadlines, filed by tick
+        self.carcass_threshold = carcass_threshold  # Carcasses are removed once their meat drops below this
+        self.carcass_queue = []  # Heap of (expiry tick, id, carcass)
+        self.spatial_hash = SpatialHash(self.pixels)
+        self.background = None
+        self.drawn_on = None
+        self.agent_rects = []
         self.seed = seed
-        random.seed(seed)
+        # Per-Map generators, so envs sharing a process never disturb each other's streams
+        self.rng = np.random.default_rng(seed)  # Bulk draws: regen rates, spawn positions, agent traits
+        self.random = random.Random(seed)  # Scalar draws made per agent during the simulation
+        self.world = self.generate_world()
+        self.region_grid = self.generate_region_grid()
+        self.land_mask = self.region_grid != OCEAN_ID
+        # Precomputed 1x, 1/2, 1/4, ... color rasters for downsampled observations and minimaps
+        self.pyramid = TerrainPyramid(REGION_COLORS[self.region_grid])
+        self.build_land_index()
         self.init_resource_generation()
         self.init_agents()
 
-    def draw(self, screen):
+    def generate_world(self):
+        # The heightmap only depends on the seed, so it is built once per Map
+        if self.terrain_backend == "numpy":
+            return perlin.fractal_noise2(self.pixels, self.pixels, self.noise_scale,
+                                         octaves=self.octaves,
+                                         persistence=self.persistence,
+                                         lacunarity=self.lacunarity,
+                                         repeatx=self.pixels,
+                                         repeaty=self.pixels,
+                                         base=self.seed)
+
         world = np.zeros((self.pixels, self.pixels))
 
         for i in range(self.pixels):
@@ -84,13 +129,20 @@ class Map:
                                             repeatx=self.pixels,
                                             repeaty=self.pixels,
                                             base=self.seed)
+        return world
 
-        for i in range(self.pixels):
-            for j in range(self.pixels):
-                value = world[i][j]
-                region = self.get_region(value)
-                color = regions[region]["color"]
-                screen.set_at((i, j), color)
+    def render_background(self):
+        return pygame.surfarray.make_surface(self.pyramid.level(0))
+
+    def draw(self, screen, incremental=False):
+        # Terrain is pre-rendered once into a surface. Incremental redraws only restore
+        # the terrain under last frame's agents, and return the rects that changed.
+        if self.background is None:
+            self.background = self.render_background()
+        if incremental and self.drawn_on is screen:
+            return [screen.blit(self.background, rect, rect) for rect in self.agent_rects]
+        self.drawn_on = screen
+        return [screen.blit(self.background, (0, 0))]
 
     def get_region(self, value):
         for region, properties in regions.items():
@@ -98,85 +150,264 @@ class Map:
                 return region
         return "ocean"
 
+    def generate_region_grid(self):
+        # Same first-match semantics as get_region, thresholded over the whole heightmap
+        region_grid = np.full(self.world.shape, OCEAN_ID, dtype=np.uint8)
+        for region_id in reversed(range(len(REGION_NAMES))):
+            low, high = regions[REGION_NAMES[region_id]]["altitude_range"]
+            region_grid[(self.world >= low) & (self.world < high)] = region_id
+        return region_grid
+
+    def get_region_at(self, x, y):
+        return REGION_NAMES[self.region_grid[x, y]]
+
+    def is_land(self, x, y):
+        return self.land_mask[x, y]
+
+    def land_at(self, x, y):
+        # is_land for arrays of pixel coordinates
+        return self.land_mask[x, y]
+
     def init_resource_generation(self):
-        self.resource_blocks = []
-        for x in range(self.pixels):
-            self.resource_blocks.append([])
-            for y in range(self.pixels):
-                regen_rate = random.random() * self.regen_multiplier
-                self.resource_blocks[x].append(ResourceBlock(x, y, regen_rate))
+        # Resources live in contiguous (size, size) grids; each cell covers scale x scale pixels
+        shape = (self.size, self.size)
+        self.regen_rate = self.rng.random(shape) * self.regen_multiplier
+        self.cap = np.full(shape, RESOURCE_CAP, dtype=np.float64)
+        self.resources = self.cap.copy()
+
+    def resource_cells(self, locations):
+        # (n, 2) pixel positions -> indices into the resource grids
+        return (np.asarray(locations, dtype=np.float64) // self.scale).astype(np.int64)
+
+    def resource_block(self, x, y):
+        return ResourceBlock(self, x, y, (int(x // self.scale), int(y // self.scale)))
 
     def init_agents(self):
         min_agents = 30
         for species in species_ref:
-            number = random.randint(min_agents, min_agents * 2)
+            number = int(self.rng.integers(min_agents, min_agents * 2, endpoint=True))
             if species_ref[species]["diet"] == "herbivore":
                 number *= 30
             self.spawn_agents(species, number)
 
     def spawn_agents(self, species, number):
-        for _ in range(number):
-            agent = Agent(species_ref[species], self)
-            location = self.spawn_location()
+        # Positions and traits for the whole batch come from a few array draws
+        params = SPECIES.params[SPECIES.ids[species]]
+        locations = self.spawn_locations(number).tolist()
+        max_ages = (params.max_longevity * 30 * self.rng.uniform(0.5, 1, number)).tolist()
+        sexes = np.where(self.rng.random(number) > 0.5, "male", "female").tolist()
+        for location, max_age, sex in zip(locations, max_ages, sexes):
+            agent = Agent(params.species_id, self, max_age=max_age, sex=sex)
             agent.location = location
-            self.agents.append(agent)
+            self.agents.add(agent)
+
+    def build_land_index(self, region_weights=None):
+        # Flat list of land cells so spawning never has to reject ocean samples.
+        # region_weights optionally maps region name -> relative spawn weight.
+        self.land_cells = np.argwhere(self.land_mask)
+        self.land_cell_weights = None
+        if region_weights is not None:
+            weight_by_id = np.array([region_weights.get(region, 1.0) for region in REGION_NAMES], dtype=np.float64)
+            weight_by_id[OCEAN_ID] = 0
+            weights = weight_by_id[self.region_grid[self.land_cells[:, 0], self.land_cells[:, 1]]]
+            self.land_cell_weights = weights / weights.sum()
+
+    def spawn_locations(self, number):
+        if len(self.land_cells) == 0:
+            raise ValueError(f"Map with seed {self.seed} has no land to spawn agents on")
+        cells = self.rng.choice(len(self.land_cells), size=number, p=self.land_cell_weights)
+        return self.land_cells[cells]
 
     def spawn_location(self):
-        while True:
-            x = random.randint(0, self.pixels - 1)
-            y = random.randint(0, self.pixels - 1)
-            if self.get_region(self.get_noise_value(x, y)) != "ocean":
-                return [x, y]
+        return self.spawn_locations(1)[0].tolist()
 
     def get_noise_value(self, x, y):
-        nx, ny = x / self.pixels - 0.5, y / self.pixels - 0.5
-        value = noise.pnoise2(nx * self.noise_scale,
-                              ny * self.noise_scale,
-                              octaves=self.octaves,
-                              persistence=self.persistence,
-                              lacunarity=self.lacunarity,
-                              repeatx=self.pixels,
-                              repeaty=self.pixels,
-                              base=self.seed)
-        return value
+        return self.world[x][y]
 
     def draw_agents(self, screen):
-        for agent in self.agents:
-            agent.draw(screen)
+        rects = (agent.draw(screen) for agent in self.agents)
+        self.agent_rects = [rect for rect in rects if rect is not None]
+        return self.agent_rects
+
+    def move_agents(self, agents):
+        # One vectorized random-walk step for every live agent in agents
+        movers = [agent for agent in agents if agent.alive]
+        locations = np.array([agent.location for agent in movers], dtype=np.float64).reshape(-1, 2)
+        steps = [agent.move_distance_in_pixels for agent in movers]
+        new_x, new_y, moved = random_walk(locations[:, 0], locations[:, 1], steps, self.pixels, self.land_at, self.rng)
+        for index in np.flatnonzero(moved).tolist():
+            movers[index].location = [new_x[index].item(), new_y[index].item()]
+
+    def schedule_carcass(self, agent):
+        heapq.heappush(self.carcass_queue, (agent.expires_at(self.carcass_threshold), id(agent), agent))
+
+    def remove_expired_carcasses(self):
+        # Pop every carcass whose meat has decayed below carcass_threshold. Eating from a
+        # carcass queues it again with an earlier expiry, so entries for agents that are
+        # already gone are skipped.
+        queue = self.carcass_queue
+        while queue and queue[0][0] <= self.tick:
+            _, _, agent = heapq.heappop(queue)
+            if agent.slot is not None:
+                self.agents.remove(agent)
+                self.spatial_hash.remove(agent)
+
+    def schedule_lifecycle(self, agent):
+        # File the deadlines fixed at birth: death by old age (age > max_age), maturity
+        # (age > age_at_first_birth) and, for carnivores, starvation if it never eats
+        self.calendar.schedule(int(agent.birth_tick + agent.max_age) + 1, AGE_DEATH, agent)
+        self.calendar.schedule(int(agent.birth_tick + agent.params.age_at_first_birth) + 1, MATURITY, agent)
+        if not agent.params.is_herbivore:
+            self.calendar.schedule(starvation_tick(agent.last_fed), STARVATION, agent)
+
+    def schedule_breeding(self, agent):
+        # Each tick is an independent BREEDING_CHANCE draw, so the wait for the next success is geometric
+        self.calendar.schedule(self.tick + int(self.rng.geometric(BREEDING_CHANCE)), BREEDING, agent)
+
+    def fire_lifecycle_events(self):
+        # Apply this tick's deaths and maturity; returns the agents due a breeding attempt,
+        # which is made once they have fed. Entries for agents already gone are skipped.
+        breeders = []
+        for kind, agent in self.calendar.pop(self.tick):
+            if agent.slot is None or not agent.alive:
+                continue
+            if kind == AGE_DEATH:
+                agent.alive = False
+            elif kind == STARVATION:
+                # Fed since this deadline was filed: refile it at the current one
+                if starvation_tick(agent.last_fed) == self.tick:
+                    agent.alive = False
+                else:
+                    self.calendar.schedule(starvation_tick(agent.last_fed), STARVATION, agent)
+            elif kind == MATURITY:
+                agent.mature = True
+                self.schedule_breeding(agent)
+            elif kind == BREEDING:
+                breeders.append(agent)
+        return breeders
+
+    def breed(self, breeders):
+        for agent in breeders:
+            if agent.alive:
+                if agent.starvation_days < 10:
+                    agent.reproduce()
+                self.schedule_breeding(agent)
 
     def simulate_agents(self):
+        self.tick += 1
+        breeders = self.fire_lifecycle_events()
         for agent in self.agents:
             agent.update()
-        self.agents = [agent for agent in self.agents if agent.alive or agent.meat_calories > 0]
+        self.breed(breeders)
+        self.move_agents(self.agents)
+        self.remove_expired_carcasses()
+        self.agents.compact()
 
 class ResourceBlock:
-    def __init__(self, x, y, regen_rate):
+    # Per-cell view onto a resources/regen_rate/cap grid owner (a Map or a world chunk)
+    def __init__(self, grids, x, y, cell=None):
+        self.grids = grids
         self.x = x
         self.y = y
-        self.cap = 10000
-        self.resources = self.cap
-        self.regen_rate = regen_rate
+        self.cell = (x, y) if cell is None else cell
+
+    @property
+    def cap(self):
+        return self.grids.cap[self.cell]
+
+    @property
+    def resources(self):
+        return self.grids.resources[self.cell]
+
+    @resources.setter
+    def resources(self, value):
+        self.grids.resources[self.cell] = value
+
+    @property
+    def regen_rate(self):
+        return self.grids.regen_rate[self.cell]
 
 class Agent:
-    def __init__(self, species_ref, simmap):
-        self.alive = True
+    __slots__ = ("_alive", "safe_to_delete", "species", "params", "simmap", "birth_tick", "max_age", "last_fed", "mature",
+                 "_location", "sex", "move_distance", "move_distance_in_pixels", "last_reproduce",
+                 "_meat", "death_tick", "slot")
+
+    def __init__(self, species_id, simmap, max_age=None, sex=None):
+        self._alive = True
         self.safe_to_delete = False
-        self.species = species_ref
+        self.params = simmap.species_table.params[species_id]  # Interned parameters read every tick
+        self.species = simmap.species_table.refs[species_id]  # Full species_ref record
         self.simmap = simmap
-        self.age = 0  # Start all agents at age 0
-        self.max_age = self.species['max_longevity'] * 30 * random.uniform(0.5, 1)
-        self.starvation_days = 0
+        self.birth_tick = simmap.tick  # Start all agents at age 0
+        if max_age is None:
+            max_age = self.params.max_longevity * 30 * simmap.random.uniform(0.5, 1)
+        self.max_age = max_age
+        self.last_fed = simmap.tick
+        self.mature = False
+        self.slot = None
         self.location = [0, 0]
-        self.sex = "male" if random.random() > 0.5 else "female"
-        self.move_distance = math.sqrt(self.species['home_range']) * 0.5
+        if sex is None:
+            sex = "male" if simmap.random.random() > 0.5 else "female"
+        self.sex = sex
+        self.move_distance = math.sqrt(self.params.home_range) * 0.5
         self.move_distance_in_pixels = self.move_distance * 0.5
         self.last_reproduce = 100000
-        self.meat_calories = self.species['adult_body_mass'] * 1500
-        self.decay_rate = DECAY_RATE
+        self.meat_calories = self.params.meat_calories
+        simmap.schedule_lifecycle(self)
+
+    @property
+    def age(self):
+        return self.simmap.tick - self.birth_tick
+
+    @property
+    def starvation_days(self):
+        return self.simmap.tick - self.last_fed
+
+    @property
+    def alive(self):
+        return self._alive
+
+    @alive.setter
+    def alive(self, alive):
+        # Dying starts the carcass's lazy decay and queues its removal
+        if self._alive and not alive:
+            self._alive = False
+            self.death_tick = self.simmap.tick
+            self.simmap.schedule_carcass(self)
+        self._alive = alive
+
+    @property
+    def meat_calories(self):
+        if self._alive:
+            return self._meat
+        return decayed(self._meat, self.simmap.tick - self.death_tick)
+
+    @meat_calories.setter
+    def meat_calories(self, meat):
+        if self._alive:
+            self._meat = meat
+        else:
+            # Stored as meat at death, so the decay since death_tick still applies; eating
+            # from a carcass brings its expiry forward
+            self._meat = meat / decayed(1.0, self.simmap.tick - self.death_tick)
+            self.simmap.schedule_carcass(self)
+
+    def expires_at(self, threshold):
+        return expiry_tick(self._meat, self.death_tick, threshold).item()
+
+    @property
+    def location(self):
+        return self._location
+
+    @location.setter
+    def location(self, location):
+        # Every move goes through here so the Map's spatial hash stays current
+        self._location = location
+        self.simmap.spatial_hash.place(self, location)
 
     def draw(self, screen):
         if not self.alive:
-            decay_factor = self.meat_calories / (self.species['adult_body_mass'] * 1500)
+            decay_factor = self.meat_calories / self.params.meat_calories
             alpha = max(0, int(decay_factor * 255))
             color = (0, 0, 0, alpha)
 
@@ -184,56 +415,30 @@ class Agent:
             temp_surface.set_alpha(alpha)
             temp_surface.fill((0, 0, 0, 0))
             pygame.draw.circle(temp_surface, (0, 0, 0), (2, 2), 2)
-            screen.blit(temp_surface, (int(self.location[0]) - 2, int(self.location[1]) - 2))
+            return screen.blit(temp_surface, (int(self.location[0]) - 2, int(self.location[1]) - 2))
 
-        elif self.species['diet'] == "herbivore":
+        elif self.params.is_herbivore:
             color = GREEN
-            pygame.draw.circle(screen, color, (int(self.location[0]), int(self.location[1])), 2)
+            return pygame.draw.circle(screen, color, (int(self.location[0]), int(self.location[1])), 2)
         else:
             color = RED
-            pygame.draw.circle(screen, color, (int(self.location[0]), int(self.location[1])), 2)
+            return pygame.draw.circle(screen, color, (int(self.location[0]), int(self.location[1])), 2)
 
     def update(self):
-        self.age += 1
-        if self.age > self.max_age or self.starvation_days > 30:
-            self.alive = False
-
-        if not self.alive:
-            self.decay()
-
+        # Aging, starvation and breeding are driven by the Map's lifecycle calendar
         if self.alive:
-            if self.species['diet'] == "herbivore":
+            if self.params.is_herbivore:
                 self.feed_plant()
             else:
                 self.feed_meat()
-            if self.age > self.species['age_at_first_birth'] and self.starvation_days < 10 and random.random() < 0.01:
-                self.reproduce()
-            self.move()
 
     def move(self):
-        if not self.alive:
-            return
-
-        for _ in range(10):  # Try up to 10 times to find a valid move
-            angle = random.uniform(0, 2 * math.pi)
-            new_x = self.location[0] + math.cos(angle) * self.move_distance_in_pixels
-            new_y = self.location[1] + math.sin(angle) * self.move_distance_in_pixels
-
-            if new_x < 0 or new_x >= WIDTH:
-                continue
-            if new_y < 0 or new_y >= HEIGHT:
-                continue
-
-            new_x = max(0, min(WIDTH-1, new_x))
-            new_y = max(0, min(HEIGHT-1, new_y))
-
-            if self.simmap.get_region(self.simmap.get_noise_value(int(new_x), int(new_y))) != "ocean":
-                self.location = [new_x, new_y]
-                break
+        # Agents normally move in the Map's batched movement phase; this steps one on its own
+        self.simmap.move_agents([self])
 
     def find_nearby_agents(self, distance):
         nearby_agents = []
-        for agent in self.simmap.agents:
+        for agent in self.simmap.spatial_hash.candidates(self.location, distance):
             if agent is not self and (agent.alive or agent.meat_calories > 0):
                 dist = math.sqrt((self.location[0] - agent.location[0])**2 + (self.location[1] - agent.location[1])**2)
                 if dist <= distance:
@@ -241,26 +446,26 @@ class Agent:
         return nearby_agents
 
     def feed_plant(self):
-        pass
+        # Plants are not limited here, so grazing always succeeds
+        self.last_fed = self.simmap.tick
+
+    def fed(self):
+        # Moves the starvation deadline back; the Map refiles it when the old one comes due
+        self.last_fed = self.simmap.tick
 
     def feed_meat(self):
         nearby_agents = self.find_nearby_agents(10)
         for agent in nearby_agents:
-            if agent.species['diet'] == "herbivore" and agent.alive:
+            if agent.params.is_herbivore and agent.alive:
                 agent.alive = False
-                self.starvation_days = 0
+                self.fed()
                 self.meat_calories += agent.meat_calories * 0.5
                 break
             elif not agent.alive and agent.meat_calories > 0:
-                self.starvation_days = 0
+                self.fed()
                 self.meat_calories += agent.meat_calories * 0.5
                 agent.meat_calories *= 0.5
                 break
-        else:
-            self.starvation_days += 1
-
-    def decay(self):
-        self.meat_calories -= self.meat_calories * self.decay_rate
 
     def reproduce(self):
         pass
@@ -280,10 +485,7 @@ class CustomEnv(gym.Env):
         return obs
 
     def step(self, action):
-        for agent in self.simmap.agents:
-            agent.move()  # Move each agent based on their own logic
-
-        self.simmap.simulate_agents()
+        self.simmap.simulate_agents()  # Moves every agent once, in the batched movement phase
         obs = self.render(mode='rgb_array')
         reward = 0  # Define your reward logic
         done = False  # Define your termination logic
@@ -291,9 +493,9 @@ class CustomEnv(gym.Env):
         return obs, reward, done, info
 
     def render(self, mode='human'):
-        self.simmap.draw(self.screen)
-        self.simmap.draw_agents(self.screen)
-        pygame.display.flip()
+        dirty_rects = self.simmap.draw(self.screen, incremental=(mode == 'human'))
+        dirty_rects += self.simmap.draw_agents(self.screen)
+        pygame.display.update(dirty_rects)
 
         if mode == 'rgb_array':
             return pygame.surfarray.array3d(self.screen).swapaxes(0, 1)
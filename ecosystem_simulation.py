@@ -1,8 +1,18 @@
 import pygame
 import random
 import noise
+import perlin
 import math
 import numpy as np
+import argparse
+from chunked_world import ChunkedWorld, CHUNK_SIZE, MEMORY_BUDGET
+from resource_block import ResourceBlock, DepletedCells, RESOURCE_CAP, graze
+from agent_pool import AgentPool, MALE, FEMALE, pool_field
+from spatial_hash import GridIndex, select_pairs
+from movement import random_walk
+from species_table import SpeciesTable
+from carcass_decay import CARCASS_THRESHOLD, decayed, expiry_tick
+from lifecycle import Calendar, AGE_DEATH, STARVATION, MATURITY, BREEDING, EXPIRY, BREEDING_CHANCE, starvation_tick
 
 # Initialize pygame
 pygame.init()
@@ -14,7 +24,9 @@ BLACK = (0, 0, 0)
 RED = (255, 0, 0)
 GREEN = (0, 255, 0)
 BLUE = (0, 0, 255)
-DECAY_RATE = 0.01  # Rate at which dead bodies decay
+GRAZE_PER_KG = 10  # Plant resources a herbivore eats per tick per kg of body mass
+FEED_RADIUS = 10  # Pixels within which a carnivore can reach prey or a carcass
+COMPACT_FRACTION = 0.25  # Share of the pool that may be tombstones before it is compacted
 
 # Create screen
 screen = pygame.display.set_mode((WIDTH, HEIGHT))
@@ -56,43 +68,108 @@ regions = {
     }
 }
 
+REGION_NAMES = list(regions)
+REGION_COLORS = np.array([regions[region]["color"] for region in REGION_NAMES], dtype=np.uint8)
+OCEAN_ID = REGION_NAMES.index("ocean")
+
 class Map:
-    def __init__(self, seed):
-        self.size = 200
-        self.pixels = 400
+    def __init__(self, seed, terrain_backend="noise", pixels=WIDTH, chunk_size=None, memory_budget=MEMORY_BUDGET, resource_cell_size=1,
+                 carcass_threshold=CARCASS_THRESHOLD):
+        self.pixels = pixels
+        if self.pixels % resource_cell_size:
+            raise ValueError(f"resource_cell_size {resource_cell_size} does not divide the map size {self.pixels}")
+        self.resource_cell_size = resource_cell_size  # Pixels per side of one resource cell
+        self.size = self.pixels // resource_cell_size  # Resource cells per side
         self.scale = self.pixels / self.size
         self.noise_scale = 3.0
         self.octaves = 6
         self.persistence = 0.5
         self.lacunarity = 2.0
+        self.terrain_backend = terrain_backend  # "noise" (per-pixel pnoise2) or "numpy" (perlin.py)
         self.regen_multiplier = 1500
-        self.agents = []
+        self.resource_cap = RESOURCE_CAP
+        self.ocean_id = OCEAN_ID
+        self.pool = AgentPool()
+        self.grid_index = GridIndex(FEED_RADIUS)  # Rebuilt from the pool before each batch of radius queries
+        self.index_stale = True  # Set whenever agents move or the pool's membership changes
+        self.background = None
+        self.drawn_once = False
+        self.agent_rects = []
+        self.cells_touched = 0  # Resource cells regrown on the last tick
+        self.tick = 0
+        self.calendar = Calendar()  # Lifecycle deadlines, filed by tick and keyed by pool uid
+        self.births = []  # Uid arrays of the parents giving birth this tick, born together in give_birth
+        self.carcass_threshold = carcass_threshold  # Carcasses are removed once their meat drops below this
+        self.expiries = Calendar()  # Carcass expiry ticks, keyed by pool uid
+        self.tombstones = 0  # Expired carcasses still in the pool, dropped at the next compaction
         self.seed = seed
-        random.seed(seed)
-        self.init_resource_generation()
+        # Per-Map generators, so envs sharing a process never disturb each other's streams
+        self.rng = np.random.default_rng(seed)  # Bulk draws: regen rates, spawn positions, agent traits
+        self.random = random.Random(seed)  # Scalar draws made per agent during the simulation
+        self.chunked_world = None
+        if chunk_size is None:
+            self.world = self.generate_world()
+            self.region_grid = self.generate_region_grid()
+            self.land_mask = self.region_grid != OCEAN_ID
+            self.build_land_index()
+            self.init_resource_generation()
+        else:
+            # Terrain and resources are generated per chunk on first access instead
+            if chunk_size % resource_cell_size:
+                raise ValueError(f"resource_cell_size {resource_cell_size} does not divide the chunk size {chunk_size}")
+            self.chunked_world = ChunkedWorld(self, chunk_size, memory_budget)
+            self.get_noise_value = self.chunked_world.get_noise_value
+            self.get_region_id = self.chunked_world.get_region_id
+            self.is_land = self.chunked_world.is_land
+            self.land_at = self.chunked_world.land_at
+            self.get_region_window = self.chunked_world.get_region_window
+            self.resource_block = self.chunked_world.resource_block
         self.init_agents()
 
-    def draw(self):
-        world = np.zeros((self.pixels, self.pixels))
-
-        for i in range(self.pixels):
-            for j in range(self.pixels):
+    def generate_world(self, x0=0, x1=None, y0=0, y1=None):
+        # The heightmap only depends on the seed, so it is built once per Map
+        # (or once per chunk for chunked worlds, which pass the window to build)
+        x1 = self.pixels if x1 is None else x1
+        y1 = self.pixels if y1 is None else y1
+        if self.terrain_backend == "numpy":
+            return perlin.fractal_noise2(self.pixels, self.pixels, self.noise_scale,
+                                         octaves=self.octaves,
+                                         persistence=self.persistence,
+                                         lacunarity=self.lacunarity,
+                                         repeatx=self.pixels,
+                                         repeaty=self.pixels,
+                                         base=self.seed,
+                                         window=(x0, x1, y0, y1))
+
+        world = np.zeros((x1 - x0, y1 - y0))
+
+        for i in range(x0, x1):
+            for j in range(y0, y1):
                 nx, ny = i / self.pixels - 0.5, j / self.pixels - 0.5
-                world[i][j] = noise.pnoise2(nx * self.noise_scale,
-                                            ny * self.noise_scale,
-                                            octaves=self.octaves,
-                                            persistence=self.persistence,
-                                            lacunarity=self.lacunarity,
-                                            repeatx=self.pixels,
-                                            repeaty=self.pixels,
-                                            base=self.seed)
-
-        for i in range(self.pixels):
-            for j in range(self.pixels):
-                value = world[i][j]
-                region = self.get_region(value)
-                color = regions[region]["color"]
-                screen.set_at((i, j), color)
+                world[i - x0][j - y0] = noise.pnoise2(nx * self.noise_scale,
+                                                      ny * self.noise_scale,
+                                                      octaves=self.octaves,
+                                                      persistence=self.persistence,
+                                                      lacunarity=self.lacunarity,
+                                                      repeatx=self.pixels,
+                                                      repeaty=self.pixels,
+                                                      base=self.seed)
+        return world
+
+    def render_background(self):
+        # Only the part of the world that fits on screen is rendered
+        region_ids = self.get_region_window(0, min(self.pixels, WIDTH), 0, min(self.pixels, HEIGHT))
+        return pygame.surfarray.make_surface(REGION_COLORS[region_ids])
+
+    def draw(self, incremental=False):
+        # Terrain is pre-rendered once into a surface. Incremental redraws only restore
+        # the terrain under last frame's agents, and return the rects that changed.
+        if self.background is None:
+            self.background = self.render_background()
+        if incremental and self.drawn_once:
+            return [screen.blit(self.background, rect, rect) for rect in self.agent_rects]
+        self.drawn_once = True
+        return [screen.blit(self.background, (0, 0))]
 
     def get_region(self, value):
         for region, properties in regions.items():
@@ -100,195 +177,408 @@ class Map:
                 return region
         return "ocean"
 
+    def generate_region_grid(self, world=None):
+        # Same first-match semantics as get_region, thresholded over the whole heightmap
+        world = self.world if world is None else world
+        region_grid = np.full(world.shape, OCEAN_ID, dtype=np.uint8)
+        for region_id in reversed(range(len(REGION_NAMES))):
+            low, high = regions[REGION_NAMES[region_id]]["altitude_range"]
+            region_grid[(world >= low) & (world < high)] = region_id
+        return region_grid
+
+    def get_region_id(self, x, y):
+        return self.region_grid[x, y]
+
+    def get_region_at(self, x, y):
+        return REGION_NAMES[self.get_region_id(x, y)]
+
+    def get_region_window(self, x0, x1, y0, y1):
+        return self.region_grid[x0:x1, y0:y1]
+
+    def is_land(self, x, y):
+        return self.land_mask[x, y]
+
+    def land_at(self, x, y):
+        # is_land for arrays of pixel coordinates
+        return self.land_mask[x, y]
+
     def init_resource_generation(self):
-        self.resource_blocks = []
-        for x in range(self.pixels):
-            self.resource_blocks.append([])
-            for y in range(self.pixels):
-                regen_rate = random.random() * self.regen_multiplier
-                self.resource_blocks[x].append(ResourceBlock(x, y, regen_rate))
+        # Resources live in contiguous (size, size) grids; each cell covers scale x scale pixels
+        shape = (self.size, self.size)
+        self.regen_rate = self.rng.random(shape) * self.regen_multiplier
+        self.cap = np.full(shape, RESOURCE_CAP, dtype=np.float64)
+        self.resources = self.cap.copy()
+        self.depleted = DepletedCells(shape)
+
+    def resource_cells(self, locations):
+        # (n, 2) pixel positions -> indices into the resource grids
+        return (np.asarray(locations, dtype=np.float64) // self.scale).astype(np.int64)
+
+    def resource_block(self, x, y):
+        return ResourceBlock(self, x, y, (int(x // self.scale), int(y // self.scale)))
 
     def init_agents(self):
         min_agents = 30
         for species in species_ref:
-            number = random.randint(min_agents, min_agents * 2)
+            number = int(self.rng.integers(min_agents, min_agents * 2, endpoint=True))
             if species_ref[species]["diet"] == "herbivore":
                 number *= 30
             self.spawn_agents(species, number)
 
     def spawn_agents(self, species, number):
-        for _ in range(number):
-            agent = Agent(species_ref[species], self)
-            location = self.spawn_location()
-            agent.location = location
-            self.agents.append(agent)
+        # Positions and traits for the whole batch come from a few array draws
+        params = SPECIES.params[SPECIES.ids[species]]
+        locations = self.spawn_locations(number)
+        ages = self.rng.uniform(0, params.max_longevity * 30, number)
+        max_ages = params.max_longevity * 30 * self.rng.uniform(0.5, 1, number)
+        sexes = np.where(self.rng.random(number) > 0.5, MALE, FEMALE)
+        indices = self.pool.add(params.species_id, locations, self.tick - ages, max_ages, sexes, params.meat_calories, self.tick)
+        self.index_stale = True
+        self.schedule_lifecycle(indices)
+
+    def build_land_index(self, region_weights=None):
+        # Flat list of land cells so spawning never has to reject ocean samples.
+        # region_weights optionally maps region name -> relative spawn weight.
+        self.land_cells = np.argwhere(self.land_mask)
+        self.land_cell_weights = None
+        if region_weights is not None:
+            weight_by_id = np.array([region_weights.get(region, 1.0) for region in REGION_NAMES], dtype=np.float64)
+            weight_by_id[OCEAN_ID] = 0
+            weights = weight_by_id[self.region_grid[self.land_cells[:, 0], self.land_cells[:, 1]]]
+            self.land_cell_weights = weights / weights.sum()
+
+    def spawn_locations(self, number):
+        if self.chunked_world is not None:
+            # Chunked worlds have no global land index, so fall back to rejection sampling
+            return np.array([self.spawn_location() for _ in range(number)], dtype=np.int64).reshape(-1, 2)
+        if len(self.land_cells) == 0:
+            raise ValueError(f"Map with seed {self.seed} has no land to spawn agents on")
+        cells = self.rng.choice(len(self.land_cells), size=number, p=self.land_cell_weights)
+        return self.land_cells[cells]
 
     def spawn_location(self):
         while True:
-            x = random.randint(0, self.pixels - 1)
-            y = random.randint(0, self.pixels - 1)
-            if self.get_region(self.get_noise_value(x, y)) != "ocean":
+            x = self.random.randint(0, self.pixels - 1)
+            y = self.random.randint(0, self.pixels - 1)
+            if self.is_land(x, y):
                 return [x, y]
 
     def get_noise_value(self, x, y):
-        nx, ny = x / self.pixels - 0.5, y / self.pixels - 0.5
-        value = noise.pnoise2(nx * self.noise_scale,
-                              ny * self.noise_scale,
-                              octaves=self.octaves,
-                              persistence=self.persistence,
-                              lacunarity=self.lacunarity,
-                              repeatx=self.pixels,
-                              repeaty=self.pixels,
-                              base=self.seed)
-        return value
+        return self.world[x][y]
+
+    @property
+    def agents(self):
+        # Index views into the pool, skipping tombstones, valid until the next simulate_agents compacts it
+        return [Agent(self, index) for index in np.flatnonzero(~self.pool.removed[:len(self.pool)]).tolist()]
 
     def draw_agents(self):
-        for agent in self.agents:
-            agent.draw()
+        self.agent_rects = [agent.draw() for agent in self.agents]
+        return self.agent_rects
+
+    def simulate_resources(self):
+        # Regrow the depleted cells, then let every living herbivore graze the cell it stands on
+        if self.chunked_world is not None:
+            self.cells_touched = self.chunked_world.regrow()
+        else:
+            self.cells_touched = self.depleted.regrow(self)
+
+        pool = self.pool
+        herbivores = np.flatnonzero(pool.alive[:len(pool)] & SPECIES.is_herbivore[pool.species[:len(pool)]])
+        if len(herbivores) == 0:
+            return
+        cells = self.resource_cells(np.column_stack((pool.x[herbivores], pool.y[herbivores])))
+        demand = SPECIES.body_mass[pool.species[herbivores]] * GRAZE_PER_KG
+        if self.chunked_world is not None:
+            grants = self.chunked_world.graze(cells, demand)
+        else:
+            grants = graze(self.resources, cells, demand, self.depleted)
+        self.mark_fed(herbivores[grants >= demand])
 
     def simulate_agents(self):
-        for agent in self.agents:
-            agent.update()
-        self.agents = [agent for agent in self.agents if agent.alive or agent.meat_calories > 0]
-
-class ResourceBlock:
-    def __init__(self, x, y, regen_rate):
-        self.x = x
-        self.y = y
-        self.cap = 10000
-        self.resources = self.cap
-        self.regen_rate = regen_rate
+        self.tick += 1
+        self.remove_expired_carcasses()
+        self.fire_lifecycle_events()
+        self.simulate_resources()
+        self.feed_carnivores()
+        self.give_birth()
+        self.move_agents()
+
+    def schedule_lifecycle(self, indices):
+        # File the deadlines fixed at birth: death by old age (age > max_age), maturity
+        # (age > age_at_first_birth) and starvation if the agent never eats
+        pool = self.pool
+        uids = pool.uid[indices]
+        birth_ticks = pool.birth_tick[indices]
+        self.calendar.schedule_many(np.floor(birth_ticks + pool.max_age[indices]) + 1, AGE_DEATH, uids)
+        self.calendar.schedule_many(np.floor(birth_ticks + SPECIES.age_at_first_birth[pool.species[indices]]) + 1, MATURITY, uids)
+        self.calendar.schedule(starvation_tick(self.tick), STARVATION, uids)
+
+    def mark_fed(self, indices):
+        # Moves the starvation deadline back; fire_lifecycle_events refiles it when the old one comes due
+        self.pool.last_fed[indices] = self.tick
+
+    def fire_lifecycle_events(self):
+        pool = self.pool
+        # Refiled together, so the tick files one calendar entry per deadline tick
+        breeders = []
+        refed = []
+        for kind, uids in self.calendar.pop(self.tick):
+            indices = pool.find(uids)
+            indices = indices[indices >= 0]
+            indices = indices[pool.alive[indices]]
+            if kind == AGE_DEATH:
+                self.kill(indices)
+            elif kind == STARVATION:
+                # Agents fed since the deadline was filed get it refiled at the current one
+                starved = starvation_tick(pool.last_fed[indices]) == self.tick
+                self.kill(indices[starved])
+                refed.append(indices[~starved])
+            elif kind == MATURITY:
+                pool.mature[indices] = True
+                breeders.append(indices)
+            elif kind == BREEDING:
+                # Whether they are fed enough is checked in give_birth, once this tick's feeding is done
+                self.births.append(pool.uid[indices])
+                breeders.append(indices)
+        if breeders:
+            self.schedule_breeding(np.concatenate(breeders))
+        if refed:
+            refed = np.concatenate(refed)
+            self.calendar.schedule_many(starvation_tick(pool.last_fed[refed]), STARVATION, pool.uid[refed])
+
+    def schedule_breeding(self, indices):
+        # Each tick is an independent BREEDING_CHANCE draw, so the wait for the next success is geometric
+        ticks = self.tick + self.rng.geometric(BREEDING_CHANCE, len(indices))
+        self.calendar.schedule_many(ticks, BREEDING, self.pool.uid[indices])
+
+    def give_birth(self):
+        # Every birth collected this tick is added in one batch: one offspring per living,
+        # well-fed parent, a random-walk step away on land, or on the parent if none is found
+        if not self.births:
+            return
+        pool = self.pool
+        parents = pool.find(np.concatenate(self.births))
+        self.births.clear()
+        parents = parents[parents >= 0]
+        parents = parents[pool.alive[parents] & (self.tick - pool.last_fed[parents] < 10)]
+        if len(parents) == 0:
+            return
+        species = pool.species[parents]
+        x, y, _ = random_walk(pool.x[parents], pool.y[parents], SPECIES.move_step[species], self.pixels, self.land_at, self.rng)
+        max_ages = SPECIES.max_longevity[species] * 30 * self.rng.uniform(0.5, 1, len(parents))
+        sexes = np.where(self.rng.random(len(parents)) > 0.5, MALE, FEMALE)
+        indices = pool.add(species, np.column_stack((x, y)), self.tick, max_ages, sexes, SPECIES.meat_calories[species], self.tick)
+        self.index_stale = True
+        self.schedule_lifecycle(indices)
+
+    def kill(self, indices):
+        # A carcass keeps its meat at death in meat_calories and decays lazily from death_tick
+        pool = self.pool
+        pool.alive[indices] = False
+        pool.death_tick[indices] = self.tick
+        self.schedule_expiry(indices)
+
+    def schedule_expiry(self, indices):
+        # File each carcass under the tick it expires. Eating from a carcass files it again
+        # with an earlier expiry, and the entry it leaves behind is skipped when it fires.
+        # Carcasses that never expire (a zero threshold) are not filed at all.
+        ticks = self.expiry_ticks(indices)
+        expiring = ticks < math.inf
+        self.expiries.schedule_many(np.maximum(ticks[expiring], self.tick + 1), EXPIRY, self.pool.uid[indices[expiring]])
+
+    def expiry_ticks(self, indices):
+        pool = self.pool
+        return expiry_tick(pool.meat_calories[indices], pool.death_tick[indices], self.carcass_threshold)
+
+    def current_meat(self, indices):
+        # Meat on live agents as stored; on carcasses decayed from the death tick to now
+        pool = self.pool
+        meat = pool.meat_calories[indices]
+        return np.where(pool.alive[indices], meat, decayed(meat, self.tick - pool.death_tick[indices]))
+
+    def remove_expired_carcasses(self):
+        # Tombstone the carcasses filed to expire this tick, then compact the pool once
+        # enough tombstones have built up rather than on every removal
+        pool = self.pool
+        for _, uids in self.expiries.pop(self.tick):
+            indices = pool.find(uids)
+            indices = indices[indices >= 0]
+            indices = indices[~pool.removed[indices]]
+            indices = indices[self.expiry_ticks(indices) <= self.tick]
+            pool.removed[indices] = True
+            self.tombstones += len(indices)
+        if self.tombstones > COMPACT_FRACTION * len(pool):
+            pool.keep(~pool.removed[:len(pool)])
+            self.tombstones = 0
+            self.index_stale = True
+
+    def index_agents(self):
+        count = len(self.pool)
+        self.grid_index.build(self.pool.x[:count], self.pool.y[:count])
+        self.index_stale = False
+
+    def refresh_index(self):
+        # Rebuild only if agents moved or joined or left the pool since the last build
+        if self.index_stale:
+            self.index_agents()
+
+    def query_radius(self, indices, distance):
+        # Other live agents and unexpired carcasses within distance of each agent in indices, in CSR
+        # form: the neighbours of indices[q] are neighbours[offsets[q]:offsets[q + 1]], in
+        # pool order, with matching distances. Call refresh_index() first.
+        pool = self.pool
+        offsets, neighbours, distances = self.grid_index.query_radius(pool.x[indices], pool.y[indices], distance)
+        owners = np.repeat(indices, np.diff(offsets))
+        return select_pairs(offsets, (neighbours != owners) & ~pool.removed[neighbours], neighbours, distances)
+
+    def feed_carnivores(self):
+        # Each carnivore, in pool order, takes the first reachable live herbivore or carcass.
+        # Feeding never changes what is edible (a kill leaves a carcass, and carcasses stay
+        # in the pool until they expire), so every choice comes from one batched query.
+        # Carnivores sharing a prey then resolve in pool order: the first kills it and each
+        # one after halves it.
+        pool = self.pool
+        count = len(pool)
+        carnivores = np.flatnonzero(pool.alive[:count] & ~SPECIES.is_herbivore[pool.species[:count]])
+        self.refresh_index()
+        offsets, nearby, _ = self.query_radius(carnivores, FEED_RADIUS)
+        edible = np.flatnonzero(~pool.alive[nearby] | SPECIES.is_herbivore[pool.species[nearby]])
+        hunters, first = np.unique(np.repeat(np.arange(len(carnivores)), np.diff(offsets))[edible], return_index=True)
+        fed = carnivores[hunters]
+        prey = nearby[edible[first]]
+        self.mark_fed(fed)
+
+        # Rank the carnivores sharing each prey; fed is in pool order, so a stable sort keeps it
+        order = np.argsort(prey, kind="stable")
+        fed, prey = fed[order], prey[order]
+        starts = np.flatnonzero(np.diff(prey, prepend=-1))
+        sharers = np.diff(np.r_[starts, len(prey)])
+        rank = np.arange(len(prey)) - np.repeat(starts, sharers)
+        meat = self.current_meat(prey)
+        was_alive = pool.alive[prey]
+
+        # Halving by powers of two is exact, so this matches feeding one carnivore at a time.
+        # Halving a carcass's meat at death halves its decayed meat too, but expires it sooner.
+        pool.meat_calories[fed] += meat * 0.5 ** np.where(was_alive, np.maximum(rank, 1), rank + 1)
+        eaten = prey[starts]
+        pool.meat_calories[eaten] *= 0.5 ** np.where(was_alive[starts], sharers - 1, sharers)
+        self.kill(eaten[was_alive[starts]])
+        self.schedule_expiry(eaten[~was_alive[starts]])
+
+    def move_agents(self):
+        # One vectorized random-walk step for every live agent, sized per species
+        pool = self.pool
+        movers = np.flatnonzero(pool.alive[:len(pool)])
+        pool.x[movers], pool.y[movers], _ = random_walk(pool.x[movers], pool.y[movers], SPECIES.move_step[pool.species[movers]],
+                                                        self.pixels, self.land_at, self.rng)
+        self.index_stale = True
 
 class Agent:
-    def __init__(self, species_ref, simmap):
-        self.alive = True
-        self.safe_to_delete = False
-        self.species = species_ref
+    # Lightweight view of one agent in the Map's AgentPool
+    alive = pool_field("alive")
+    max_age = pool_field("max_age")
+
+    def __init__(self, simmap, index):
         self.simmap = simmap
-        self.age = random.uniform(0, self.species['max_longevity'] * 30)
-        self.max_age = self.species['max_longevity'] * 30 * random.uniform(0.5, 1)
-        self.starvation_days = 0
-        self.location = [0, 0]
-        self.sex = "male" if random.random() > 0.5 else "female"
-        self.move_distance = math.sqrt(self.species['home_range']) * 0.5
-        self.move_distance_in_pixels = self.move_distance * 0.5
-        self.last_reproduce = 100000
-        self.meat_calories = self.species['adult_body_mass'] * 1500
-        self.decay_rate = DECAY_RATE
+        self.pool = simmap.pool
+        self.index = index
+
+    @property
+    def age(self):
+        return self.simmap.tick - self.pool.birth_tick[self.index].item()
+
+    @property
+    def starvation_days(self):
+        return self.simmap.tick - self.pool.last_fed[self.index].item()
+
+    @property
+    def meat_calories(self):
+        return self.simmap.current_meat(self.index).item()
+
+    @property
+    def species(self):
+        return SPECIES.refs[self.pool.species[self.index]]
+
+    @property
+    def params(self):
+        return SPECIES.params[self.pool.species[self.index]]
+
+    @property
+    def sex(self):
+        return "male" if self.pool.sex[self.index] == MALE else "female"
+
+    @property
+    def location(self):
+        return [self.pool.x[self.index].item(), self.pool.y[self.index].item()]
+
+    @location.setter
+    def location(self, location):
+        self.pool.x[self.index], self.pool.y[self.index] = location
+        self.simmap.index_stale = True
+
+    @property
+    def move_distance_in_pixels(self):
+        return SPECIES.move_step[self.pool.species[self.index]].item()
 
     def draw(self):
+        x, y = self.location
         if not self.alive:
-            decay_factor = self.meat_calories / (self.species['adult_body_mass'] * 1500)
+            decay_factor = self.meat_calories / self.params.meat_calories
             alpha = max(0, int(decay_factor * 255))
-            color = (0, 0, 0, alpha)
 
             temp_surface = pygame.Surface((4, 4), pygame.SRCALPHA)
             temp_surface.set_alpha(alpha)
             temp_surface.fill((0, 0, 0, 0))
             pygame.draw.circle(temp_surface, (0, 0, 0), (2, 2), 2)
-            screen.blit(temp_surface, (int(self.location[0]) - 2, int(self.location[1]) - 2))
+            return screen.blit(temp_surface, (int(x) - 2, int(y) - 2))
 
-        elif self.species['diet'] == "herbivore":
+        elif self.params.is_herbivore:
             color = GREEN
-            pygame.draw.circle(screen, color, (int(self.location[0]), int(self.location[1])), 2)
+            return pygame.draw.circle(screen, color, (int(x), int(y)), 2)
         else:
             color = RED
-            pygame.draw.circle(screen, color, (int(self.location[0]), int(self.location[1])), 2)
-
-    def update(self):
-        self.age += 1
-        if self.age > self.max_age or self.starvation_days > 30:
-            self.alive = False
+            return pygame.draw.circle(screen, color, (int(x), int(y)), 2)
 
-        if not self.alive:
-            self.decay()
-
-        if self.alive:
-            if self.species['diet'] == "herbivore":
-                self.feed_plant()
-            else:
-                self.feed_meat()
-            if self.age > self.species['age_at_first_birth'] and self.starvation_days < 10 and random.random() < 0.01:
-                self.reproduce()
-            self.move()
-
-    def move(self):
-        if not self.alive:
-            return
-
-        for _ in range(10):  # Try up to 10 times to find a valid move
-            angle = random.uniform(0, 2 * math.pi)
-            new_x = self.location[0] + math.cos(angle) * self.move_distance_in_pixels
-            new_y = self.location[1] + math.sin(angle) * self.move_distance_in_pixels
-
-            if new_x < 0 or new_x >= WIDTH:
-                continue
-            if new_y < 0 or new_y >= HEIGHT:
-                continue
-
-            new_x = max(0, min(WIDTH-1, new_x))
-            new_y = max(0, min(HEIGHT-1, new_y))
-
-            if self.simmap.get_region(self.simmap.get_noise_value(int(new_x), int(new_y))) != "ocean":
-                self.location = [new_x, new_y]
-                break
+    def reproduce(self):
+        # Queued with the tick's other births, which are all added at once
+        self.simmap.births.append(self.pool.uid[self.index:self.index + 1])
 
     def find_nearby_agents(self, distance):
-        nearby_agents = []
-        for agent in self.simmap.agents:
-            if agent is not self and (agent.alive or agent.meat_calories > 0):
-                dist = math.sqrt((self.location[0] - agent.location[0])**2 + (self.location[1] - agent.location[1])**2)
-                if dist <= distance:
-                    nearby_agents.append(agent)
-        return nearby_agents
-
-    def feed_plant(self):
-        pass
-
-    def feed_meat(self):
-        nearby_agents = self.find_nearby_agents(10)
-        for agent in nearby_agents:
-            if agent.species['diet'] == "herbivore" and agent.alive:
-                agent.alive = False
-                self.starvation_days = 0
-                self.meat_calories += agent.meat_calories * 0.5
-                break
-            elif not agent.alive and agent.meat_calories > 0:
-                self.starvation_days = 0
-                self.meat_calories += agent.meat_calories * 0.5
-                agent.meat_calories *= 0.5
-                break
-        else:
-            self.starvation_days += 1
-
-    def decay(self):
-        self.meat_calories -= self.meat_calories * self.decay_rate
-
-    def reproduce(self):
-        pass
+        self.simmap.refresh_index()
+        _, nearby, _ = self.simmap.query_radius(np.array([self.index]), distance)
+        return [Agent(self.simmap, index) for index in nearby.tolist()]
 
 species_ref = {
     "wolf": {"common_name": "wolf", "diet": "carnivore", "adult_body_mass": 31, "age_at_first_birth": 547, "max_longevity": 354, "home_range": 159.86},
     "moose": {"common_name": "moose", "diet": "herbivore", "adult_body_mass": 461, "age_at_first_birth": 1216, "max_longevity": 324, "home_range": 71.75},
     "beaver": {"common_name": "beaver", "diet": "herbivore", "adult_body_mass": 18, "age_at_first_birth": 220, "max_longevity": 180, "home_range": 5.5}
 }
+SPECIES = SpeciesTable(species_ref)  # Parameter columns indexed by the species ids stored in the AgentPool
 
-def main():
+def main(pixels=WIDTH, chunk_size=None, terrain_backend="noise", resource_cell_size=1):
     seed = random.randint(0, 1000000)
-    simmap = Map(seed)
+    simmap = Map(seed, terrain_backend=terrain_backend, pixels=pixels, chunk_size=chunk_size,
+                 resource_cell_size=resource_cell_size)
     clock = pygame.time.Clock()
+    screen.fill(WHITE)
     running = True
     while running:
         for event in pygame.event.get():
             if event.type == pygame.QUIT:
                 running = False
-        screen.fill(WHITE)
-        simmap.draw()
+        # Only the areas agents moved from or to are pushed to the display
+        dirty_rects = simmap.draw(incremental=True)
         simmap.simulate_agents()
-        simmap.draw_agents()
-        pygame.display.flip()
+        dirty_rects += simmap.draw_agents()
+        pygame.display.update(dirty_rects)
         clock.tick(60)
     pygame.quit()
 
 if __name__ == "__main__":
-    main()
+    parser = argparse.ArgumentParser(description="Run the ecosystem simulation")
+    parser.add_argument("--pixels", type=int, default=WIDTH, help="World size in pixels (the screen shows the top-left corner)")
+    parser.add_argument("--chunk-size", type=int, default=None, help=f"Generate the world lazily in chunks (e.g. {CHUNK_SIZE})")
+    parser.add_argument("--terrain-backend", choices=["noise", "numpy"], default="noise")
+    parser.add_argument("--resource-cell-size", type=int, default=1, help="Pixels per side of one resource cell")
+    args = parser.parse_args()
+    main(args.pixels, args.chunk_size, args.terrain_backend, args.resource_cell_size)
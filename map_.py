@@ -1,6 +1,5 @@
 import pygame
-import noise
-import numpy as np
+import perlin
 
 # Initialize Pygame
 pygame.init()
@@ -23,19 +22,14 @@ octaves = 6
 persistence = 0.5
 lacunarity = 2.0
 
-world = np.zeros((width, height))
-
-for i in range(width):
-    for j in range(height):
-        nx, ny = i/width - 0.5, j/height - 0.5
-        world[i][j] = noise.pnoise2(nx * scale, 
-                                    ny * scale, 
-                                    octaves=octaves, 
-                                    persistence=persistence, 
-                                    lacunarity=lacunarity, 
-                                    repeatx=width, 
-                                    repeaty=height, 
-                                    base=0)
+# Vectorized equivalent of calling noise.pnoise2 per pixel (matches it for base=0)
+world = perlin.fractal_noise2(width, height, scale,
+                              octaves=octaves,
+                              persistence=persistence,
+                              lacunarity=lacunarity,
+                              repeatx=width,
+                              repeaty=height,
+                              base=0)
 
 # Map Perlin noise values to colors
 for i in range(width):
@@ -0,0 +1,40 @@
+# movement.py
+# Vectorized random-walk step. Candidates are tried as attempt-by-attempt array passes:
+# each pass draws one heading per mover still looking, rejects candidates that leave
+# the map or land in the ocean against the land mask, and settles every mover whose
+# candidate survived. Headings index a precomputed table of unit vectors, so no
+# trigonometry runs per step.
+import numpy as np
+
+MOVE_ATTEMPTS = 10  # Headings tried per agent before it gives up and stays put
+HEADINGS = 4096  # Directions a step can take, evenly spaced around the circle
+HEADING_COS = np.cos(np.arange(HEADINGS) * (2 * np.pi / HEADINGS))
+HEADING_SIN = np.sin(np.arange(HEADINGS) * (2 * np.pi / HEADINGS))
+
+
+def random_walk(x, y, steps, pixels, land_at, rng, attempts=MOVE_ATTEMPTS):
+    # x, y and steps are per-mover arrays; land_at(xs, ys) tests integer pixel arrays.
+    # Returns the new x and y arrays and a mask of the movers that found a valid step.
+    x = np.asarray(x, dtype=np.float64)
+    y = np.asarray(y, dtype=np.float64)
+    steps = np.asarray(steps, dtype=np.float64)
+    new_x, new_y = x.copy(), y.copy()
+    moved = np.zeros(len(x), dtype=bool)
+
+    # Most movers settle on their first candidate, so later passes only see the few left
+    pending = np.arange(len(x))
+    for _ in range(attempts):
+        heading = rng.integers(0, HEADINGS, len(pending))
+        candidate_x = x[pending] + HEADING_COS[heading] * steps[pending]
+        candidate_y = y[pending] + HEADING_SIN[heading] * steps[pending]
+        valid = (candidate_x >= 0) & (candidate_x < pixels) & (candidate_y >= 0) & (candidate_y < pixels)
+        valid[valid] = land_at(candidate_x[valid].astype(np.int64), candidate_y[valid].astype(np.int64))
+
+        accepted = pending[valid]
+        new_x[accepted] = candidate_x[valid]
+        new_y[accepted] = candidate_y[valid]
+        moved[accepted] = True
+        pending = pending[~valid]
+        if len(pending) == 0:
+            break
+    return new_x, new_y, moved
@@ -0,0 +1,112 @@
+# perlin.py
+# Vectorized NumPy port of noise.pnoise2 for generating whole heightmaps at once.
+# The world is built tile by tile (chunk_size x chunk_size) so temporaries stay
+# bounded, and `out` may be an np.memmap for worlds that do not fit in memory.
+import numpy as np
+
+# Permutation table from the noise module (_noise.h)
+PERM = np.array([
+    151, 160, 137, 91, 90, 15, 131, 13, 201, 95, 96, 53, 194, 233, 7, 225, 140,
+    36, 103, 30, 69, 142, 8, 99, 37, 240, 21, 10, 23, 190, 6, 148, 247, 120,
+    234, 75, 0, 26, 197, 62, 94, 252, 219, 203, 117, 35, 11, 32, 57, 177, 33,
+    88, 237, 149, 56, 87, 174, 20, 125, 136, 171, 168, 68, 175, 74, 165, 71,
+    134, 139, 48, 27, 166, 77, 146, 158, 231, 83, 111, 229, 122, 60, 211, 133,
+    230, 220, 105, 92, 41, 55, 46, 245, 40, 244, 102, 143, 54, 65, 25, 63, 161,
+    1, 216, 80, 73, 209, 76, 132, 187, 208, 89, 18, 169, 200, 196, 135, 130,
+    116, 188, 159, 86, 164, 100, 109, 198, 173, 186, 3, 64, 52, 217, 226, 250,
+    124, 123, 5, 202, 38, 147, 118, 126, 255, 82, 85, 212, 207, 206, 59, 227,
+    47, 16, 58, 17, 182, 189, 28, 42, 223, 183, 170, 213, 119, 248, 152, 2, 44,
+    154, 163, 70, 221, 153, 101, 155, 167, 43, 172, 9, 129, 22, 39, 253, 19,
+    98, 108, 110, 79, 113, 224, 232, 178, 185, 112, 104, 218, 246, 97, 228,
+    251, 34, 242, 193, 238, 210, 144, 12, 191, 179, 162, 241, 81, 51, 145, 235,
+    249, 14, 239, 107, 49, 192, 214, 31, 181, 199, 106, 157, 184, 84, 204, 176,
+    115, 121, 50, 45, 127, 4, 150, 254, 138, 236, 205, 93, 222, 114, 67, 29,
+    24, 72, 243, 141, 128, 195, 78, 66, 215, 61, 156, 180
+], dtype=np.int64)
+
+# x/y components of the GRAD3 vectors noise.pnoise2 hashes into
+GRAD2 = np.array([
+    [1, 1], [-1, 1], [1, -1], [-1, -1],
+    [1, 0], [-1, 0], [1, 0], [-1, 0],
+    [0, 1], [0, -1], [0, 1], [0, -1],
+    [1, 0], [-1, 0], [0, -1], [0, 1],
+], dtype=np.float64)
+
+CHUNK_SIZE = 256
+
+
+def permutation_table(base):
+    # noise.pnoise2 only stays inside its 512-entry table for base 0 and 1, and reads
+    # past the end for anything larger. Those two bases reproduce it exactly; every
+    # other base gets its own shuffled table, which is a distinct terrain flavor.
+    if base in (0, 1):
+        return PERM, base
+    return np.random.default_rng(base).permutation(256).astype(np.int64), 0
+
+
+def gradient_tables(perm):
+    # Fold the second permutation lookup and the gradient selection into two tables
+    hashed = perm[perm] & 15
+    return GRAD2[hashed, 0], GRAD2[hashed, 1]
+
+
+def noise2(x, y, repeatx, repeaty, perm, base, grad_x, grad_y):
+    # x is a column of row coordinates and y a row of column coordinates; everything
+    # that depends on only one axis is computed in 1D before broadcasting.
+    i = np.floor(np.fmod(x, repeatx)).astype(np.int64)
+    j = np.floor(np.fmod(y, repeaty)).astype(np.int64)
+    ii = np.fmod(i + 1, repeatx).astype(np.int64)
+    jj = np.fmod(j + 1, repeaty).astype(np.int64)
+    j = (j & 255) + base
+    jj = (jj & 255) + base
+    a = perm[((i & 255) + base) & 255]
+    b = perm[((ii & 255) + base) & 255]
+
+    x = x - np.floor(x)
+    y = y - np.floor(y)
+    fx = x * x * x * (x * (x * 6 - 15) + 10)
+    fy = y * y * y * (y * (y * 6 - 15) + 10)
+
+    h = (a + j) & 255
+    n00 = grad_x[h] * x + grad_y[h] * y
+    h = (b + j) & 255
+    n10 = grad_x[h] * (x - 1) + grad_y[h] * y
+    h = (a + jj) & 255
+    n01 = grad_x[h] * x + grad_y[h] * (y - 1)
+    h = (b + jj) & 255
+    n11 = grad_x[h] * (x - 1) + grad_y[h] * (y - 1)
+    nx0 = n00 + fx * (n10 - n00)
+    nx1 = n01 + fx * (n11 - n01)
+    return nx0 + fy * (nx1 - nx0)
+
+
+def fractal_noise2(width, height, scale, octaves=1, persistence=0.5, lacunarity=2.0,
+                   repeatx=1024, repeaty=1024, base=0, chunk_size=CHUNK_SIZE, out=None, window=None):
+    # Same layout as the per-pixel loops:
+    # out[i][j] == pnoise2((i / width - 0.5) * scale, (j / height - 0.5) * scale, ...)
+    # window=(x_start, x_stop, y_start, y_stop) generates only that part of the world.
+    if octaves < 1:
+        raise ValueError("Expected octaves value > 0")
+    x_start, x_stop, y_start, y_stop = window if window is not None else (0, width, 0, height)
+    if out is None:
+        out = np.empty((x_stop - x_start, y_stop - y_start), dtype=np.float64)
+    perm, offset = permutation_table(base)
+    grad_x, grad_y = gradient_tables(perm)
+
+    for x0 in range(x_start, x_stop, chunk_size):
+        x1 = min(x0 + chunk_size, x_stop)
+        nx = (np.arange(x0, x1) / width - 0.5)[:, None] * scale
+        for y0 in range(y_start, y_stop, chunk_size):
+            y1 = min(y0 + chunk_size, y_stop)
+            ny = (np.arange(y0, y1) / height - 0.5)[None, :] * scale
+
+            total = np.zeros((x1 - x0, y1 - y0))
+            freq, amp, max_amp = 1.0, 1.0, 0.0
+            for _ in range(octaves):
+                total += amp * noise2(nx * freq, ny * freq, repeatx * freq, repeaty * freq,
+                                      perm, offset, grad_x, grad_y)
+                max_amp += amp
+                freq *= lacunarity
+                amp *= persistence
+            out[x0 - x_start:x1 - x_start, y0 - y_start:y1 - y_start] = total / max_amp
+    return out
@@ -0,0 +1,102 @@
+import numpy as np
+
+RESOURCE_CAP = 10000  # Maximum resources a cell can hold
+COMPACT_INTERVAL = 16  # Ticks between dropping regrown cells from the depleted set
+
+
+class ResourceBlock:
+    # Per-cell view onto a resources/regen_rate/cap grid owner (a Map or a world chunk)
+    def __init__(self, grids, x, y, cell=None):
+        self.grids = grids
+        self.x = x
+        self.y = y
+        self.cell = (x, y) if cell is None else cell
+
+    @property
+    def cap(self):
+        return self.grids.cap[self.cell]
+
+    @property
+    def resources(self):
+        return self.grids.resources[self.cell]
+
+    @resources.setter
+    def resources(self, value):
+        self.grids.resources[self.cell] = value
+        self.grids.depleted.add(np.ravel_multi_index(self.cell, self.grids.resources.shape))
+
+    @property
+    def regen_rate(self):
+        return self.grids.regen_rate[self.cell]
+
+
+class DepletedCells:
+    # Flat indices of the cells that may be below cap. Only these are regrown, so a tick
+    # costs as much as the grazing that happened rather than the area of the world.
+    def __init__(self, shape):
+        self.member = np.zeros(shape[0] * shape[1], dtype=bool)
+        self.cells = np.empty(0, dtype=np.int64)
+        self.ticks = 0
+        self.touched = 0  # Cells regrown on the last tick
+
+    def add(self, flat_cells):
+        flat_cells = np.unique(flat_cells)
+        new_cells = flat_cells[~self.member[flat_cells]]
+        if len(new_cells):
+            self.member[new_cells] = True
+            self.cells = np.concatenate((self.cells, new_cells))
+
+    def regrow(self, grids):
+        resources = grids.resources.reshape(-1)
+        cells = self.cells
+        resources[cells] = np.minimum(resources[cells] + grids.regen_rate.reshape(-1)[cells],
+                                      grids.cap.reshape(-1)[cells])
+        self.touched = len(cells)
+        self.ticks += 1
+        if self.ticks % COMPACT_INTERVAL == 0:
+            self.compact(grids)
+        return self.touched
+
+    def compact(self, grids):
+        # Regrown cells stay listed (and are harmlessly re-clamped) until the next compaction
+        below_cap = grids.resources.reshape(-1)[self.cells] < grids.cap.reshape(-1)[self.cells]
+        self.member[self.cells[~below_cap]] = False
+        self.cells = self.cells[below_cap]
+
+    def __len__(self):
+        return len(self.cells)
+
+
+def share(cells, available, demand):
+    # Grazers with equal cells share one cell holding available (repeated per grazer) and
+    # eat in the order given, each taking what is left up to its demand. Returns the
+    # stable order sorting grazers by cell, where each cell's run starts in that order,
+    # and the amount each sorted grazer ate.
+    order = np.argsort(cells, kind="stable")
+    sorted_cells = cells[order]
+    sorted_demand = demand[order]
+
+    # Demand already served ahead of each grazer on the same cell
+    starts = np.flatnonzero(np.r_[True, sorted_cells[1:] != sorted_cells[:-1]])
+    eaten_before = np.cumsum(sorted_demand) - sorted_demand
+    eaten_before -= np.repeat(eaten_before[starts], np.diff(np.r_[starts, len(sorted_cells)]))
+    return order, starts, np.clip(available[order] - eaten_before, 0, sorted_demand)
+
+
+def graze(resources, cells, demand, depleted=None):
+    # cells is an (n, 2) array of grazer positions and demand how much each wants to eat.
+    # Grazers sharing a cell eat in the order given, each taking what is left up to its
+    # demand, so contention resolves the same way every run. Returns the amount each ate.
+    grants = np.zeros(len(cells), dtype=np.float64)
+    if len(cells) == 0:
+        return grants
+    flat_resources = resources.reshape(-1)
+    flat_cells = np.ravel_multi_index((cells[:, 0], cells[:, 1]), resources.shape)
+    order, starts, sorted_grants = share(flat_cells, flat_resources[flat_cells], demand)
+    sorted_cells = flat_cells[order]
+    eaten = np.add.reduceat(sorted_grants, starts)
+    flat_resources[sorted_cells[starts]] -= eaten
+    if depleted is not None:
+        depleted.add(sorted_cells[starts][eaten > 0])
+    grants[order] = sorted_grants
+    return grants
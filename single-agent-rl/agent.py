@@ -1,6 +1,6 @@
-import random
 import numpy as np
 import pygame
+from carcass_decay import decayed, expiry_tick
 WIDTH, HEIGHT = 400, 400
 
 regions = {
@@ -11,26 +11,90 @@ regions = {
     "mountain": {"altitude_range": [0.2, 0.4], "color": (139, 137, 137)},
     "snow": {"altitude_range": [0.4, 1.0], "color": (255, 250, 250)},
 }
+
+REGION_NAMES = list(regions)
+REGION_COLORS = np.array([regions[region]["color"] for region in REGION_NAMES], dtype=np.uint8)
 class Agent:
-    def __init__(self, species_ref, simmap):
-        self.alive = True
+    __slots__ = ("_alive", "safe_to_delete", "species", "params", "simmap", "birth_tick", "max_age", "last_fed", "mature",
+                 "_location", "sex", "move_distance", "move_distance_in_pixels", "last_reproduce",
+                 "_meat", "death_tick", "slot")
+
+    def __init__(self, species_id, simmap, max_age=None, sex=None):
+        self._alive = True
         self.safe_to_delete = False
-        self.species = species_ref
+        self.params = simmap.species_table.params[species_id]  # Interned parameters read every tick
+        self.species = simmap.species_table.refs[species_id]  # Full species_ref record
         self.simmap = simmap
-        self.age = 0  # Start all agents at age 0
-        self.max_age = self.species['max_longevity'] * 30 * random.uniform(0.5, 1)
-        self.starvation_days = 0
+        self.birth_tick = simmap.tick  # Start all agents at age 0
+        if max_age is None:
+            max_age = self.params.max_longevity * 30 * simmap.random.uniform(0.5, 1)
+        self.max_age = max_age
+        self.last_fed = simmap.tick
+        self.mature = False
+        self.slot = None
         self.location = [0, 0]
-        self.sex = "male" if random.random() > 0.5 else "female"
-        self.move_distance = np.sqrt(self.species['home_range']) * 0.5
+        if sex is None:
+            sex = "male" if simmap.random.random() > 0.5 else "female"
+        self.sex = sex
+        self.move_distance = np.sqrt(self.params.home_range) * 0.5
         self.move_distance_in_pixels = self.move_distance * 0.5
         self.last_reproduce = 100000
-        self.meat_calories = self.species['adult_body_mass'] * 1500
-        self.decay_rate = 0.01
+        self.meat_calories = self.params.meat_calories
+        simmap.schedule_lifecycle(self)
+
+    @property
+    def age(self):
+        return self.simmap.tick - self.birth_tick
+
+    @property
+    def starvation_days(self):
+        return self.simmap.tick - self.last_fed
+
+    @property
+    def alive(self):
+        return self._alive
+
+    @alive.setter
+    def alive(self, alive):
+        # Dying starts the carcass's lazy decay and queues its removal
+        if self._alive and not alive:
+            self._alive = False
+            self.death_tick = self.simmap.tick
+            self.simmap.schedule_carcass(self)
+        self._alive = alive
+
+    @property
+    def meat_calories(self):
+        if self._alive:
+            return self._meat
+        return decayed(self._meat, self.simmap.tick - self.death_tick)
+
+    @meat_calories.setter
+    def meat_calories(self, meat):
+        if self._alive:
+            self._meat = meat
+        else:
+            # Stored as meat at death, so the decay since death_tick still applies; eating
+            # from a carcass brings its expiry forward
+            self._meat = meat / decayed(1.0, self.simmap.tick - self.death_tick)
+            self.simmap.schedule_carcass(self)
+
+    def expires_at(self, threshold):
+        return expiry_tick(self._meat, self.death_tick, threshold).item()
+
+    @property
+    def location(self):
+        return self._location
+
+    @location.setter
+    def location(self, location):
+        # Every move goes through here so the Map's spatial hash stays current
+        self._location = location
+        self.simmap.spatial_hash.place(self, location)
 
     def draw(self, screen):
         if not self.alive:
-            decay_factor = self.meat_calories / (self.species['adult_body_mass'] * 1500)
+            decay_factor = self.meat_calories / self.params.meat_calories
             alpha = max(0, int(decay_factor * 255))
             color = (0, 0, 0, alpha)
 
@@ -38,52 +102,26 @@ class Agent:
             temp_surface.set_alpha(alpha)
             temp_surface.fill((0, 0, 0, 0))
             pygame.draw.circle(temp_surface, (0, 0, 0), (2, 2), 2)
-            screen.blit(temp_surface, (int(self.location[0]) - 2, int(self.location[1]) - 2))
+            return screen.blit(temp_surface, (int(self.location[0]) - 2, int(self.location[1]) - 2))
 
-        elif self.species['diet'] == "herbivore":
+        elif self.params.is_herbivore:
             color = (0, 255, 0)  # Green
-            pygame.draw.circle(screen, color, (int(self.location[0]), int(self.location[1])), 2)
+            return pygame.draw.circle(screen, color, (int(self.location[0]), int(self.location[1])), 2)
         else:
             color = (255, 0, 0)  # Red
-            pygame.draw.circle(screen, color, (int(self.location[0]), int(self.location[1])), 2)
+            return pygame.draw.circle(screen, color, (int(self.location[0]), int(self.location[1])), 2)
 
     def update(self):
-        self.age += 1
-        if self.age > self.max_age or self.starvation_days > 30:
-            self.alive = False
-
-        if not self.alive:
-            self.decay()
-
+        # Aging, starvation and breeding are driven by the Map's lifecycle calendar
         if self.alive:
-            if self.species['diet'] == "herbivore":
+            if self.params.is_herbivore:
                 self.feed_plant()
             else:
                 self.feed_meat()
-            if self.age > self.species['age_at_first_birth'] and self.starvation_days < 10 and random.random() < 0.01:
-                self.reproduce()
-            self.move()
 
     def move(self):
-        if not self.alive:
-            return
-
-        for _ in range(10):  # Try up to 10 times to find a valid move
-            angle = random.uniform(0, 2 * np.pi)
-            new_x = self.location[0] + np.cos(angle) * self.move_distance_in_pixels
-            new_y = self.location[1] + np.sin(angle) * self.move_distance_in_pixels
-
-            if new_x < 0 or new_x >= WIDTH:
-                continue
-            if new_y < 0 or new_y >= HEIGHT:
-                continue
-
-            new_x = max(0, min(WIDTH-1, new_x))
-            new_y = max(0, min(HEIGHT-1, new_y))
-
-            if self.simmap.get_region(self.simmap.get_noise_value(int(new_x), int(new_y))) != "ocean":
-                self.location = [new_x, new_y]
-                break
+        # Agents normally move in the Map's batched movement phase; this steps one on its own
+        self.simmap.move_agents([self])
 
     def move_up(self):
         self._move_direction(0, -1)
@@ -116,18 +154,19 @@ class Agent:
         new_x = self.location[0] + dx * self.move_distance_in_pixels
         new_y = self.location[1] + dy * self.move_distance_in_pixels
 
-        if new_x < 0 or new_x >= WIDTH or new_y < 0 or new_y >= HEIGHT:
+        pixels = self.simmap.pixels
+        if new_x < 0 or new_x >= pixels or new_y < 0 or new_y >= pixels:
             return
 
-        new_x = max(0, min(WIDTH-1, new_x))
-        new_y = max(0, min(HEIGHT-1, new_y))
+        new_x = max(0, min(pixels - 1, new_x))
+        new_y = max(0, min(pixels - 1, new_y))
 
-        if self.simmap.get_region(self.simmap.get_noise_value(int(new_x), int(new_y))) != "ocean":
+        if self.simmap.is_land(int(new_x), int(new_y)):
             self.location = [new_x, new_y]
 
     def find_nearby_agents(self, distance):
         nearby_agents = []
-        for agent in self.simmap.agents:
+        for agent in self.simmap.spatial_hash.candidates(self.location, distance):
             if agent is not self and (agent.alive or agent.meat_calories > 0):
                 dist = np.sqrt((self.location[0] - agent.location[0])**2 + (self.location[1] - agent.location[1])**2)
                 if dist <= distance:
@@ -135,40 +174,29 @@ class Agent:
         return nearby_agents
 
     def feed_plant(self):
-        pass
+        # Plants are not limited here, so grazing always succeeds
+        self.last_fed = self.simmap.tick
+
+    def fed(self):
+        # Moves the starvation deadline back; the Map refiles it when the old one comes due
+        self.last_fed = self.simmap.tick
 
     def feed_meat(self):
         nearby_agents = self.find_nearby_agents(10)
         for agent in nearby_agents:
-            if agent.species['diet'] == "herbivore" and agent.alive:
+            if agent.params.is_herbivore and agent.alive:
                 agent.alive = False
-                self.starvation_days = 0
+                self.fed()
                 self.meat_calories += agent.meat_calories * 0.5
                 break
             elif not agent.alive and agent.meat_calories > 0:
-                self.starvation_days = 0
+                self.fed()
                 self.meat_calories += agent.meat_calories * 0.5
                 agent.meat_calories *= 0.5
                 break
-        else:
-            self.starvation_days += 1
-
-    def decay(self):
-        self.meat_calories -= self.meat_calories * self.decay_rate
 
     def reproduce(self):
         pass
     def get_surrounding_tiles(self):
-        x, y = int(self.location[0]), int(self.location[1])
-        tiles = np.zeros((84, 84, 3), dtype=np.uint8)
-
-        for i in range(-42, 42):
-            for j in range(-42, 42):
-                nx, ny = x + i, y + j
-                if 0 <= nx < WIDTH and 0 <= ny < HEIGHT:
-                    region = self.simmap.get_region(self.simmap.get_noise_value(nx, ny))
-                    tiles[i + 42, j + 42] = regions[region]["color"]
-                else:
-                    tiles[i + 42, j + 42] = (0, 0, 0)  # Black for out-of-bounds
-        return tiles
-
+        # 84x84 full-resolution crop around the agent, black for out-of-bounds
+        return self.simmap.pyramid.local_view(self.location[0], self.location[1], 84)
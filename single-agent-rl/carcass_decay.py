@@ -0,0 +1,23 @@
+# carcass_decay.py
+# Closed-form carcass decay. A carcass loses DECAY_RATE of its meat every tick, so
+# rather than updating every carcass each tick its meat is evaluated on demand as
+# m0 * (1 - DECAY_RATE) ** (tick - death_tick). The same formula gives the tick at
+# which a carcass falls below the removal threshold, which is what the expiry queues
+# are ordered by.
+import numpy as np
+
+DECAY_RATE = 0.01  # Fraction of a carcass's meat lost per tick
+CARCASS_THRESHOLD = 1.0  # Meat calories below which a carcass is removed
+
+
+def decayed(meat, elapsed, rate=DECAY_RATE):
+    # Meat left elapsed ticks after death from meat at the time of death
+    return meat * (1 - rate) ** elapsed
+
+
+def expiry_tick(meat, death_tick, threshold=CARCASS_THRESHOLD, rate=DECAY_RATE):
+    # First tick at which decayed(meat, tick - death_tick) is below threshold. Works on
+    # scalars and arrays; empty carcasses expire at once and a zero threshold never expires.
+    with np.errstate(divide="ignore", invalid="ignore"):
+        ticks = np.log(threshold / np.asarray(meat, dtype=np.float64)) / np.log1p(-rate)
+    return death_tick + np.floor(ticks) + 1
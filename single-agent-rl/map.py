@@ -1,7 +1,17 @@
 import noise
+import perlin
+from terrain_pyramid import TerrainPyramid
+from spatial_hash import SpatialHash
+from agent_slots import AgentSlots
+from species_table import SpeciesTable
+from carcass_decay import CARCASS_THRESHOLD
+from movement import random_walk
+from lifecycle import Calendar, AGE_DEATH, STARVATION, MATURITY, BREEDING, BREEDING_CHANCE, starvation_tick
+import heapq
 import numpy as np
 import random
-from resource_block import ResourceBlock
+import pygame
+from resource_block import ResourceBlock, RESOURCE_CAP
 from agent import Agent
 
 SIZE = 400  # Define the size for the map
@@ -15,28 +25,64 @@ regions = {
     "mountain": {"altitude_range": [0.2, 0.4], "color": (139, 137, 137)},
     "snow": {"altitude_range": [0.4, 1.0], "color": (255, 250, 250)},
 }
+
+REGION_NAMES = list(regions)
+REGION_COLORS = np.array([regions[region]["color"] for region in REGION_NAMES], dtype=np.uint8)
+OCEAN_ID = REGION_NAMES.index("ocean")
 species_ref = {
     "wolf": {"common_name": "wolf", "diet": "carnivore", "adult_body_mass": 31, "age_at_first_birth": 547, "max_longevity": 354, "home_range": 159.86},
     "moose": {"common_name": "moose", "diet": "herbivore", "adult_body_mass": 461, "age_at_first_birth": 1216, "max_longevity": 324, "home_range": 71.75},
     "beaver": {"common_name": "beaver", "diet": "herbivore", "adult_body_mass": 18, "age_at_first_birth": 220, "max_longevity": 180, "home_range": 5.5},
 }
+SPECIES = SpeciesTable(species_ref)  # Interned species ids and their parameter columns
 class Map:
-    def __init__(self, seed):
-        self.size = 200
-        self.pixels = SIZE
+    def __init__(self, seed, terrain_backend="noise", pixels=SIZE, resource_cell_size=1, carcass_threshold=CARCASS_THRESHOLD):
+        self.pixels = pixels
+        if self.pixels % resource_cell_size:
+            raise ValueError(f"resource_cell_size {resource_cell_size} does not divide the map size {self.pixels}")
+        self.resource_cell_size = resource_cell_size  # Pixels per side of one resource cell
+        self.size = self.pixels // resource_cell_size  # Resource cells per side
         self.scale = self.pixels / self.size
         self.noise_scale = 3.0
         self.octaves = 6
         self.persistence = 0.5
         self.lacunarity = 2.0
+        self.terrain_backend = terrain_backend  # "noise" (per-pixel pnoise2) or "numpy" (perlin.py)
         self.regen_multiplier = 1500
-        self.agents = []
+        self.agents = AgentSlots()
+        self.species_table = SPECIES
+        self.tick = 0
+        self.calendar = Calendar()  # Lifecycle deadlines, filed by tick
+        self.carcass_threshold = carcass_threshold  # Carcasses are removed once their meat drops below this
+        self.carcass_queue = []  # Heap of (expiry tick, id, carcass)
+        self.spatial_hash = SpatialHash(self.pixels)
+        self.background = None
+        self.drawn_on = None
+        self.agent_rects = []
         self.seed = seed
-        random.seed(seed)
+        # Per-Map generators, so envs sharing a process never disturb each other's streams
+        self.rng = np.random.default_rng(seed)  # Bulk draws: regen rates, spawn positions, agent traits
+        self.random = random.Random(seed)  # Scalar draws made per agent during the simulation
+        self.world = self.generate_world()
+        self.region_grid = self.generate_region_grid()
+        self.land_mask = self.region_grid != OCEAN_ID
+        # Precomputed 1x, 1/2, 1/4, ... color rasters for downsampled observations and minimaps
+        self.pyramid = TerrainPyramid(REGION_COLORS[self.region_grid])
+        self.build_land_index()
         self.init_resource_generation()
         self.init_agents()
 
-    def draw(self, screen):
+    def generate_world(self):
+        # The heightmap only depends on the seed, so it is built once per Map
+        if self.terrain_backend == "numpy":
+            return perlin.fractal_noise2(self.pixels, self.pixels, self.noise_scale,
+                                         octaves=self.octaves,
+                                         persistence=self.persistence,
+                                         lacunarity=self.lacunarity,
+                                         repeatx=self.pixels,
+                                         repeaty=self.pixels,
+                                         base=self.seed)
+
         world = np.zeros((self.pixels, self.pixels))
 
         for i in range(self.pixels):
@@ -50,13 +96,20 @@ class Map:
                                             repeatx=self.pixels,
                                             repeaty=self.pixels,
                                             base=self.seed)
+        return world
 
-        for i in range(self.pixels):
-            for j in range(self.pixels):
-                value = world[i][j]
-                region = self.get_region(value)
-                color = regions[region]["color"]
-                screen.set_at((i, j), color)
+    def render_background(self):
+        return pygame.surfarray.make_surface(self.pyramid.level(0))
+
+    def draw(self, screen, incremental=False):
+        # Terrain is pre-rendered once into a surface. Incremental redraws only restore
+        # the terrain under last frame's agents, and return the rects that changed.
+        if self.background is None:
+            self.background = self.render_background()
+        if incremental and self.drawn_on is screen:
+            return [screen.blit(self.background, rect, rect) for rect in self.agent_rects]
+        self.drawn_on = screen
+        return [screen.blit(self.background, (0, 0))]
 
     def get_region(self, value):
         for region, properties in regions.items():
@@ -64,13 +117,37 @@ class Map:
                 return region
         return "ocean"
 
+    def generate_region_grid(self):
+        # Same first-match semantics as get_region, thresholded over the whole heightmap
+        region_grid = np.full(self.world.shape, OCEAN_ID, dtype=np.uint8)
+        for region_id in reversed(range(len(REGION_NAMES))):
+            low, high = regions[REGION_NAMES[region_id]]["altitude_range"]
+            region_grid[(self.world >= low) & (self.world < high)] = region_id
+        return region_grid
+
+    def get_region_at(self, x, y):
+        return REGION_NAMES[self.region_grid[x, y]]
+
+    def is_land(self, x, y):
+        return self.land_mask[x, y]
+
+    def land_at(self, x, y):
+        # is_land for arrays of pixel coordinates
+        return self.land_mask[x, y]
+
     def init_resource_generation(self):
-        self.resource_blocks = []
-        for x in range(self.pixels):
-            self.resource_blocks.append([])
-            for y in range(self.pixels):
-                regen_rate = random.random() * self.regen_multiplier
-                self.resource_blocks[x].append(ResourceBlock(x, y, regen_rate))
+        # Resources live in contiguous (size, size) grids; each cell covers scale x scale pixels
+        shape = (self.size, self.size)
+        self.regen_rate = self.rng.random(shape) * self.regen_multiplier
+        self.cap = np.full(shape, RESOURCE_CAP, dtype=np.float64)
+        self.resources = self.cap.copy()
+
+    def resource_cells(self, locations):
+        # (n, 2) pixel positions -> indices into the resource grids
+        return (np.asarray(locations, dtype=np.float64) // self.scale).astype(np.int64)
+
+    def resource_block(self, x, y):
+        return ResourceBlock(self, x, y, (int(x // self.scale), int(y // self.scale)))
 
     def init_agents(self):
         for species in species_ref:
@@ -80,37 +157,114 @@ class Map:
             self.spawn_agents(species, number)
 
     def spawn_agents(self, species, number):
-        for _ in range(number):
-            agent = Agent(species_ref[species], self)
-            location = self.spawn_location()
+        # Positions and traits for the whole batch come from a few array draws
+        params = SPECIES.params[SPECIES.ids[species]]
+        locations = self.spawn_locations(number).tolist()
+        max_ages = (params.max_longevity * 30 * self.rng.uniform(0.5, 1, number)).tolist()
+        sexes = np.where(self.rng.random(number) > 0.5, "male", "female").tolist()
+        for location, max_age, sex in zip(locations, max_ages, sexes):
+            agent = Agent(params.species_id, self, max_age=max_age, sex=sex)
             agent.location = location
-            self.agents.append(agent)
+            self.agents.add(agent)
+
+    def build_land_index(self, region_weights=None):
+        # Flat list of land cells so spawning never has to reject ocean samples.
+        # region_weights optionally maps region name -> relative spawn weight.
+        self.land_cells = np.argwhere(self.land_mask)
+        self.land_cell_weights = None
+        if region_weights is not None:
+            weight_by_id = np.array([region_weights.get(region, 1.0) for region in REGION_NAMES], dtype=np.float64)
+            weight_by_id[OCEAN_ID] = 0
+            weights = weight_by_id[self.region_grid[self.land_cells[:, 0], self.land_cells[:, 1]]]
+            self.land_cell_weights = weights / weights.sum()
+
+    def spawn_locations(self, number):
+        if len(self.land_cells) == 0:
+            raise ValueError(f"Map with seed {self.seed} has no land to spawn agents on")
+        cells = self.rng.choice(len(self.land_cells), size=number, p=self.land_cell_weights)
+        return self.land_cells[cells]
 
     def spawn_location(self):
-        while True:
-            x = random.randint(0, self.pixels - 1)
-            y = random.randint(0, self.pixels - 1)
-            if self.get_region(self.get_noise_value(x, y)) != "ocean":
-                # print (x, y)
-                return [x, y]
+        return self.spawn_locations(1)[0].tolist()
 
     def get_noise_value(self, x, y):
-        nx, ny = x / self.pixels - 0.5, y / self.pixels - 0.5
-        value = noise.pnoise2(nx * self.noise_scale,
-                              ny * self.noise_scale,
-                              octaves=self.octaves,
-                              persistence=self.persistence,
-                              lacunarity=self.lacunarity,
-                              repeatx=self.pixels,
-                              repeaty=self.pixels,
-                              base=self.seed)
-        return value
+        return self.world[x][y]
 
     def draw_agents(self, screen):
-        for agent in self.agents:
-            agent.draw(screen)
+        rects = (agent.draw(screen) for agent in self.agents)
+        self.agent_rects = [rect for rect in rects if rect is not None]
+        return self.agent_rects
+
+    def move_agents(self, agents):
+        # One vectorized random-walk step for every live agent in agents
+        movers = [agent for agent in agents if agent.alive]
+        locations = np.array([agent.location for agent in movers], dtype=np.float64).reshape(-1, 2)
+        steps = [agent.move_distance_in_pixels for agent in movers]
+        new_x, new_y, moved = random_walk(locations[:, 0], locations[:, 1], steps, self.pixels, self.land_at, self.rng)
+        for index in np.flatnonzero(moved).tolist():
+            movers[index].location = [new_x[index].item(), new_y[index].item()]
+
+    def schedule_carcass(self, agent):
+        heapq.heappush(self.carcass_queue, (agent.expires_at(self.carcass_threshold), id(agent), agent))
+
+    def remove_expired_carcasses(self):
+        # Pop every carcass whose meat has decayed below carcass_threshold. Eating from a
+        # carcass queues it again with an earlier expiry, so entries for agents that are
+        # already gone are skipped.
+        queue = self.carcass_queue
+        while queue and queue[0][0] <= self.tick:
+            _, _, agent = heapq.heappop(queue)
+            if agent.slot is not None:
+                self.agents.remove(agent)
+                self.spatial_hash.remove(agent)
+
+    def schedule_lifecycle(self, agent):
+        # File the deadlines fixed at birth: death by old age (age > max_age), maturity
+        # (age > age_at_first_birth) and, for carnivores, starvation if it never eats
+        self.calendar.schedule(int(agent.birth_tick + agent.max_age) + 1, AGE_DEATH, agent)
+        self.calendar.schedule(int(agent.birth_tick + agent.params.age_at_first_birth) + 1, MATURITY, agent)
+        if not agent.params.is_herbivore:
+            self.calendar.schedule(starvation_tick(agent.last_fed), STARVATION, agent)
+
+    def schedule_breeding(self, agent):
+        # Each tick is an independent BREEDING_CHANCE draw, so the wait for the next success is geometric
+        self.calendar.schedule(self.tick + int(self.rng.geometric(BREEDING_CHANCE)), BREEDING, agent)
+
+    def fire_lifecycle_events(self):
+        # Apply this tick's deaths and maturity; returns the agents due a breeding attempt,
+        # which is made once they have fed. Entries for agents already gone are skipped.
+        breeders = []
+        for kind, agent in self.calendar.pop(self.tick):
+            if agent.slot is None or not agent.alive:
+                continue
+            if kind == AGE_DEATH:
+                agent.alive = False
+            elif kind == STARVATION:
+                # Fed since this deadline was filed: refile it at the current one
+                if starvation_tick(agent.last_fed) == self.tick:
+                    agent.alive = False
+                else:
+                    self.calendar.schedule(starvation_tick(agent.last_fed), STARVATION, agent)
+            elif kind == MATURITY:
+                agent.mature = True
+                self.schedule_breeding(agent)
+            elif kind == BREEDING:
+                breeders.append(agent)
+        return breeders
+
+    def breed(self, breeders):
+        for agent in breeders:
+            if agent.alive:
+                if agent.starvation_days < 10:
+                    agent.reproduce()
+                self.schedule_breeding(agent)
 
     def simulate_agents(self):
+        self.tick += 1
+        breeders = self.fire_lifecycle_events()
         for agent in self.agents:
             agent.update()
-        self.agents = [agent for agent in self.agents if agent.alive or agent.meat_calories > 0]
\ No newline at end of file
+        self.breed(breeders)
+        self.move_agents(self.agents)
+        self.remove_expired_carcasses()
+        self.agents.compact()
@@ -0,0 +1,89 @@
+# seed_library.py
+# Prebuilt episode starts for CarnivoreEnv. Each entry holds the heightmap, region
+# raster, land-cell index and initial agent placements for one seed, so env resets
+# only have to load a compressed .npz instead of regenerating the world.
+import argparse
+import os
+import time
+import multiprocessing
+import numpy as np
+
+LIBRARY_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "seed_library")
+
+
+class SeedLibrary:
+    def __init__(self, library_dir=LIBRARY_DIR):
+        self.library_dir = library_dir
+        os.makedirs(self.library_dir, exist_ok=True)
+
+    def entry_path(self, key):
+        # key is the Map's terrain_key(): (seed, pixels, noise_scale, octaves, persistence, lacunarity, terrain_backend)
+        return os.path.join(self.library_dir, "_".join(str(part) for part in key) + ".npz")
+
+    def contains(self, key):
+        return os.path.exists(self.entry_path(key))
+
+    def names(self):
+        return sorted(file_name for file_name in os.listdir(self.library_dir) if file_name.endswith(".npz"))
+
+    def load(self, name):
+        with np.load(os.path.join(self.library_dir, name)) as entry:
+            return {field: entry[field] for field in entry.files}
+
+    def store(self, simmap):
+        path = self.entry_path(simmap.terrain_key())
+        tmp_path = f"{path}.{os.getpid()}.tmp"
+        with open(tmp_path, "wb") as f:
+            np.savez_compressed(f,
+                                seed=np.array(simmap.seed),
+                                terrain_backend=np.array(simmap.terrain_backend),
+                                world=np.asarray(simmap.world),
+                                region_grid=np.asarray(simmap.region_grid),
+                                land_cells=simmap.land_cells,
+                                agent_species=np.array([agent.species['common_name'] for agent in simmap.agents]),
+                                agent_locations=np.array([agent.location for agent in simmap.agents], dtype=np.int64))
+        os.replace(tmp_path, path)
+
+
+def build_entry(task):
+    library_dir, seed, terrain_backend = task
+    from single_agent_env import Map
+
+    start = time.perf_counter()
+    SeedLibrary(library_dir).store(Map(seed, terrain_backend=terrain_backend))
+    return seed, time.perf_counter() - start
+
+
+def build_library(library, seeds, terrain_backend="noise", workers=None):
+    from single_agent_env import SIZE, NOISE_SCALE, OCTAVES, PERSISTENCE, LACUNARITY
+
+    pending = []
+    for seed in seeds:
+        # Same key as Map.terrain_key(), without building the Map
+        key = (seed, SIZE, NOISE_SCALE, OCTAVES, PERSISTENCE, LACUNARITY, terrain_backend)
+        if library.contains(key):
+            print(f"Seed {seed}: already in library, skipped")
+        else:
+            pending.append((library.library_dir, seed, terrain_backend))
+
+    total_start = time.perf_counter()
+    # Spawn fresh workers rather than forking a parent that has already initialized pygame.
+    # The workers' SDL swallows SIGTERM, so they are shut down cleanly instead of terminated.
+    with multiprocessing.get_context("spawn").Pool(workers) as pool:
+        for seed, elapsed in pool.imap_unordered(build_entry, pending):
+            print(f"Seed {seed}: built in {elapsed:.3f}s")
+        pool.close()
+        pool.join()
+    print(f"Built {len(pending)} seeds in {time.perf_counter() - total_start:.2f}s")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Build a library of prebuilt worlds for CarnivoreEnv")
+    parser.add_argument("--start", type=int, default=0)
+    parser.add_argument("--stop", type=int, default=100)
+    parser.add_argument("--terrain-backend", choices=["noise", "numpy"], default="noise")
+    parser.add_argument("--workers", type=int, default=None, help="Process pool size (defaults to the CPU count)")
+    parser.add_argument("--library-dir", default=LIBRARY_DIR)
+    args = parser.parse_args()
+
+    build_library(SeedLibrary(args.library_dir), range(args.start, args.stop), args.terrain_backend, args.workers)
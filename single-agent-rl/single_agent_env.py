@@ -1,22 +1,34 @@
 import pygame
 import random
 import noise
+import perlin
+from terrain_pyramid import TerrainPyramid
+from spatial_hash import SpatialHash
+from agent_slots import AgentSlots
+from species_table import SpeciesTable
 import math
 import numpy as np
 import gymnasium as gym
 from gymnasium import spaces
+from terrain_cache import TerrainCache
 
 # Initialize pygame
 pygame.init()
 SIZE = 100
 # Define constants
 WIDTH, HEIGHT = SIZE, SIZE
+RESOURCE_CAP = 10000  # Maximum resources a cell can hold
 WHITE = (255, 255, 255)
 BLACK = (0, 0, 0)
 RED = (255, 0, 0)
 GREEN = (0, 255, 0)
 BLUE = (0, 0, 255)
 MIN_AGENTS = 1  # Minimum number of agents to spawn
+# Terrain noise parameters
+NOISE_SCALE = 3.0
+OCTAVES = 6
+PERSISTENCE = 0.5
+LACUNARITY = 2.0
 # Define regions
 regions = {
     "ocean": {
@@ -45,35 +57,75 @@ regions = {
     }
 }
 
+REGION_NAMES = list(regions)
+REGION_COLORS = np.array([regions[region]["color"] for region in REGION_NAMES], dtype=np.uint8)
+OCEAN_ID = REGION_NAMES.index("ocean")
+
 # Define species reference
 species_ref = {
     "wolf": {"common_name": "wolf", "diet": "carnivore", "adult_body_mass": 31, "age_at_first_birth": 547, "max_longevity": 354, "home_range": 159.86},
     "moose": {"common_name": "moose", "diet": "herbivore", "adult_body_mass": 461, "age_at_first_birth": 1216, "max_longevity": 324, "home_range": 71.75},
     "beaver": {"common_name": "beaver", "diet": "herbivore", "adult_body_mass": 18, "age_at_first_birth": 220, "max_longevity": 180, "home_range": 5.5}
 }
+SPECIES = SpeciesTable(species_ref)  # Interned species ids and their parameter columns
 
 class Map:
-    def __init__(self, seed):
-        self.size = 50
-        self.pixels = SIZE
+    def __init__(self, seed, terrain_cache=None, terrain_backend="noise", seed_entry=None, pixels=SIZE, resource_cell_size=1):
+        self.pixels = pixels
+        if self.pixels % resource_cell_size:
+            raise ValueError(f"resource_cell_size {resource_cell_size} does not divide the map size {self.pixels}")
+        self.resource_cell_size = resource_cell_size  # Pixels per side of one resource cell
+        self.size = self.pixels // resource_cell_size  # Resource cells per side
         self.scale = self.pixels / self.size
-        self.noise_scale = 3.0
-        self.octaves = 6
-        self.persistence = 0.5
-        self.lacunarity = 2.0
+        self.noise_scale = NOISE_SCALE
+        self.octaves = OCTAVES
+        self.persistence = PERSISTENCE
+        self.lacunarity = LACUNARITY
+        self.terrain_backend = terrain_backend  # "noise" (per-pixel pnoise2) or "numpy" (perlin.py)
         self.regen_multiplier = 1500
-        self.agents = []
+        self.agents = AgentSlots()
+        self.species_table = SPECIES
+        self.spatial_hash = SpatialHash(self.pixels)
+        self.background = None
+        self.drawn_on = None
+        self.agent_rects = []
         self.seed = seed
-        random.seed(seed)
-        self.carnivores = []
+        # Per-Map generators, so envs sharing a process never disturb each other's streams
+        self.rng = np.random.default_rng(seed)  # Bulk draws: regen rates, spawn positions, agent traits
+        self.random = random.Random(seed)  # Scalar draws made per agent during the simulation
+        self.carnivores = self.agents.with_diet('carnivore')  # Live view, kept current by AgentSlots
+        if seed_entry is not None:
+            # Prebuilt by seed_library.py: terrain, land index and starting placements
+            self.world, self.region_grid = seed_entry["world"], seed_entry["region_grid"]
+        else:
+            self.world, self.region_grid = self.load_terrain(terrain_cache)
+        self.land_mask = self.region_grid != OCEAN_ID
+        # Precomputed 1x, 1/2, 1/4, ... color rasters for downsampled observations and minimaps
+        self.pyramid = TerrainPyramid(REGION_COLORS[self.region_grid])
+        self.land_cells = seed_entry["land_cells"] if seed_entry is not None else np.argwhere(self.land_mask)
         self.init_resource_generation()
-        self.init_agents()
-        self.world = np.zeros((self.pixels, self.pixels))
+        if seed_entry is not None:
+            self.place_agents(seed_entry["agent_species"], seed_entry["agent_locations"])
+        else:
+            self.init_agents()
+
+    def generate_world(self):
+        # The heightmap only depends on the seed, so it is built once per Map
+        if self.terrain_backend == "numpy":
+            return perlin.fractal_noise2(self.pixels, self.pixels, self.noise_scale,
+                                         octaves=self.octaves,
+                                         persistence=self.persistence,
+                                         lacunarity=self.lacunarity,
+                                         repeatx=self.pixels,
+                                         repeaty=self.pixels,
+                                         base=self.seed)
+
+        world = np.zeros((self.pixels, self.pixels))
 
         for i in range(self.pixels):
             for j in range(self.pixels):
                 nx, ny = i / self.pixels - 0.5, j / self.pixels - 0.5
-                self.world[i][j] = noise.pnoise2(nx * self.noise_scale,
+                world[i][j] = noise.pnoise2(nx * self.noise_scale,
                                             ny * self.noise_scale,
                                             octaves=self.octaves,
                                             persistence=self.persistence,
@@ -81,11 +133,45 @@ class Map:
                                             repeatx=self.pixels,
                                             repeaty=self.pixels,
                                             base=self.seed)
-
-    def draw(self, screen):
-        for i in range(self.pixels):
-            for j in range(self.pixels):
-                screen.set_at((i, j), (0, 0, 0))
+        return world
+
+    def terrain_key(self):
+        return (self.seed, self.pixels, self.noise_scale, self.octaves, self.persistence, self.lacunarity,
+                self.terrain_backend)
+
+    def load_terrain(self, terrain_cache):
+        if terrain_cache is not None:
+            cached = terrain_cache.load(self.terrain_key())
+            if cached is not None:
+                return cached
+
+        self.world = self.generate_world()
+        region_grid = self.generate_region_grid()
+        if terrain_cache is not None:
+            return terrain_cache.store(self.terrain_key(), self.world, region_grid)
+        return self.world, region_grid
+
+    def generate_region_grid(self):
+        region_grid = np.full(self.world.shape, OCEAN_ID, dtype=np.uint8)
+        for region_id in reversed(range(len(REGION_NAMES))):
+            low, high = regions[REGION_NAMES[region_id]]["altitude_range"]
+            region_grid[(self.world >= low) & (self.world < high)] = region_id
+        return region_grid
+
+    def render_background(self):
+        background = pygame.Surface((self.pixels, self.pixels))
+        background.fill(BLACK)
+        return background
+
+    def draw(self, screen, incremental=False):
+        # Terrain is pre-rendered once into a surface. Incremental redraws only restore
+        # the terrain under last frame's agents, and return the rects that changed.
+        if self.background is None:
+            self.background = self.render_background()
+        if incremental and self.drawn_on is screen:
+            return [screen.blit(self.background, rect, rect) for rect in self.agent_rects]
+        self.drawn_on = screen
+        return [screen.blit(self.background, (0, 0))]
 
     # def get_region(self, value):
     #     for region, properties in regions.items():
@@ -94,12 +180,18 @@ class Map:
     #     return "ocean"
 
     def init_resource_generation(self):
-        self.resource_blocks = []
-        for x in range(self.pixels):
-            self.resource_blocks.append([])
-            for y in range(self.pixels):
-                regen_rate = random.random() * self.regen_multiplier
-                self.resource_blocks[x].append(ResourceBlock(x, y, regen_rate))
+        # Resources live in contiguous (size, size) grids; each cell covers scale x scale pixels
+        shape = (self.size, self.size)
+        self.regen_rate = self.rng.random(shape) * self.regen_multiplier
+        self.cap = np.full(shape, RESOURCE_CAP, dtype=np.float64)
+        self.resources = self.cap.copy()
+
+    def resource_cells(self, locations):
+        # (n, 2) pixel positions -> indices into the resource grids
+        return (np.asarray(locations, dtype=np.float64) // self.scale).astype(np.int64)
+
+    def resource_block(self, x, y):
+        return ResourceBlock(self, x, y, (int(x // self.scale), int(y // self.scale)))
 
     def init_agents(self):
         for species in species_ref:
@@ -107,83 +199,114 @@ class Map:
             if species_ref[species]["diet"] == "herbivore":
                 number = MIN_AGENTS*25
             self.spawn_agents(species, number)
-        self.carnivores = [agent for agent in self.agents if agent.species['diet'] == 'carnivore']
         print(f"Number of carnivores: {len(self.carnivores)}")
 
+    def place_agents(self, species_names, locations):
+        for species, location in zip(species_names.tolist(), locations.tolist()):
+            agent = Agent(SPECIES.ids[species], self)
+            agent.location = location
+            self.agents.add(agent)
+
     def spawn_agents(self, species, number):
-        for _ in range(number):
-            agent = Agent(species_ref[species], self)
-            location = self.spawn_location()
+        # Same uniform placement as spawn_location, drawn for the whole batch at once
+        for location in self.rng.integers(0, self.pixels, size=(number, 2)).tolist():
+            agent = Agent(SPECIES.ids[species], self)
             agent.location = location
-            self.agents.append(agent)
+            self.agents.add(agent)
 
     def spawn_location(self):
         while True:
-            x = random.randint(0, self.pixels - 1)
-            y = random.randint(0, self.pixels - 1)
+            x = self.random.randint(0, self.pixels - 1)
+            y = self.random.randint(0, self.pixels - 1)
             return [x, y]
 
     def get_noise_value(self, x, y):
-        nx, ny = x / self.pixels - 0.5, y / self.pixels - 0.5
-        value = noise.pnoise2(nx * self.noise_scale,
-                              ny * self.noise_scale,
-                              octaves=self.octaves,
-                              persistence=self.persistence,
-                              lacunarity=self.lacunarity,
-                              repeatx=self.pixels,
-                              repeaty=self.pixels,
-                              base=self.seed)
-        return value
+        return self.world[x][y]
 
     def draw_agents(self, screen):
-        for agent in self.agents:
-            agent.draw(screen)
+        rects = (agent.draw(screen) for agent in self.agents)
+        self.agent_rects = [rect for rect in rects if rect is not None]
+        return self.agent_rects
 
     def simulate_agents_and_return_reward(self):
         reward = 0
         for agent in self.carnivores:
             agent_reward = agent.update_and_return_reward()
             reward = agent_reward
-        self.agents = [agent for agent in self.agents if agent.alive]
+        for agent in self.agents:
+            if not agent.alive:
+                self.agents.remove(agent)
+                self.spatial_hash.remove(agent)
+        self.agents.compact()
         return reward
 
 class ResourceBlock:
-    def __init__(self, x, y, regen_rate):
+    # Per-cell view onto a resources/regen_rate/cap grid owner (a Map or a world chunk)
+    def __init__(self, grids, x, y, cell=None):
+        self.grids = grids
         self.x = x
         self.y = y
-        self.cap = 10000
-        self.resources = self.cap
-        self.regen_rate = regen_rate
+        self.cell = (x, y) if cell is None else cell
+
+    @property
+    def cap(self):
+        return self.grids.cap[self.cell]
+
+    @property
+    def resources(self):
+        return self.grids.resources[self.cell]
+
+    @resources.setter
+    def resources(self, value):
+        self.grids.resources[self.cell] = value
+
+    @property
+    def regen_rate(self):
+        return self.grids.regen_rate[self.cell]
 
 class Agent:
-    def __init__(self, species_ref, simmap):
+    __slots__ = ("alive", "safe_to_delete", "species", "params", "simmap", "starvation_days", "_location",
+                 "move_distance_in_pixels", "slot")
+
+    def __init__(self, species_id, simmap):
         self.alive = True
         self.safe_to_delete = False
-        self.species = species_ref
+        self.params = simmap.species_table.params[species_id]  # Interned parameters read every tick
+        self.species = simmap.species_table.refs[species_id]  # Full species_ref record
         self.simmap = simmap
         self.starvation_days = 0
         self.location = [0, 0]
         self.move_distance_in_pixels = 1
 
+    @property
+    def location(self):
+        return self._location
+
+    @location.setter
+    def location(self, location):
+        # Every move goes through here so the Map's spatial hash stays current
+        self._location = location
+        self.simmap.spatial_hash.place(self, location)
+
     def draw(self, screen):
         if not self.alive:
             pass
-        elif self.species['diet'] == "herbivore":
+        elif self.params.is_herbivore:
             color = GREEN
-            pygame.draw.circle(screen, color, (int(self.location[0]), int(self.location[1])), 2)
+            return pygame.draw.circle(screen, color, (int(self.location[0]), int(self.location[1])), 2)
         else:
             color = RED
-            pygame.draw.circle(screen, color, (int(self.location[0]), int(self.location[1])), 2)
+            return pygame.draw.circle(screen, color, (int(self.location[0]), int(self.location[1])), 2)
 
     def update_and_return_reward(self):
         reward = 0
         nearby_agents, nearest_agent_dist = self.find_nearby_agents(10)
         if (len(nearby_agents)==0):
             self.starvation_days += 1
-            #reward += -1*nearest_agent_dist
+            #reward += -1*nearest_agent_dist  # needs find_nearby_agents(10, nearest=True)
         else:
             for agent in nearby_agents:
-                if agent.species['diet'] == "herbivore" and agent.alive:
+                if agent.params.is_herbivore and agent.alive:
                     agent.alive = False
                     reward += 100 #- self.starvation_days
                     self.starvation_days = 0
@@ -220,33 +343,42 @@ class Agent:
         new_x = self.location[0] + dx * self.move_distance_in_pixels
         new_y = self.location[1] + dy * self.move_distance_in_pixels
 
-        if new_x < 0 or new_x >= WIDTH or new_y < 0 or new_y >= HEIGHT:
+        pixels = self.simmap.pixels
+        if new_x < 0 or new_x >= pixels or new_y < 0 or new_y >= pixels:
             return
 
-        new_x = max(0, min(WIDTH-1, new_x))
-        new_y = max(0, min(HEIGHT-1, new_y))
+        new_x = max(0, min(pixels - 1, new_x))
+        new_y = max(0, min(pixels - 1, new_y))
         
         self.location = [new_x, new_y]
 
-    def find_nearby_agents(self, distance):
+    def find_nearby_agents(self, distance, nearest=False):
+        # The nearest-agent distance can search every bucket on a sparse map, so it is
+        # only computed when asked for; otherwise it is returned as None
         nearby_agents = []
-        nearest_agent_dist = 1000000
-        for agent in self.simmap.agents:
+        for agent in self.simmap.spatial_hash.candidates(self.location, distance):
             if agent is not self and (agent.alive):
                 dist = math.sqrt((self.location[0] - agent.location[0])**2 + (self.location[1] - agent.location[1])**2)
                 if dist <= distance:
                     nearby_agents.append(agent)
-                if dist < nearest_agent_dist:
-                    nearest_agent_dist = dist
+        nearest_agent_dist = None
+        if nearest:
+            nearest_agent_dist = self.simmap.spatial_hash.nearest_distance(
+                self.location, lambda agent: agent is not self and agent.alive, 1000000)
         return (nearby_agents, nearest_agent_dist)
 
 class CarnivoreEnv(gym.Env):
-    def __init__(self):
+    def __init__(self, seed_library=None, terrain_cache=None):
         super(CarnivoreEnv, self).__init__()
         self.seed = random.randint(0, 1000000)
-        self.simmap = Map(self.seed)
-        self.carnivores = [agent for agent in self.simmap.agents if agent.species['diet'] == 'carnivore']
-        self.herbivores = [agent for agent in self.simmap.agents if agent.species['diet'] == 'herbivore']
+        # Created on first use, so envs fed entirely from a seed library never touch the disk cache
+        self.terrain_cache = terrain_cache
+        # Sample episodes from a prebuilt seed library when one is given (see seed_library.py)
+        self.seed_library = seed_library
+        self.library_entries = seed_library.names() if seed_library is not None else []
+        self.simmap = self.new_map()
+        self.carnivores = list(self.simmap.agents.with_diet('carnivore'))
+        self.herbivores = list(self.simmap.agents.with_diet('herbivore'))
         self.action_space = spaces.Discrete(8 * len(self.carnivores))  # 8 possible movement directions for each carnivore agent
         self.observation_space = spaces.Box(low=0, high=255, shape=(WIDTH, HEIGHT, 3), dtype=np.uint8)
         self.screen = pygame.display.set_mode((WIDTH, HEIGHT))
@@ -256,8 +388,8 @@ class CarnivoreEnv(gym.Env):
 
     def reset(self, seed=None, options=None):
         # self.simmap = Map(self.seed) # To keep the same map for all episodes.
-        self.simmap = Map(random.randint(0, 1000000))
-        self.carnivores = [agent for agent in self.simmap.agents if agent.species['diet'] == 'carnivore']
+        self.simmap = self.new_map()
+        self.carnivores = list(self.simmap.agents.with_diet('carnivore'))
         with open("no_decay_attack_only_step.txt", "a") as f:
             f.write(str(self.current_step) + "\n")
         self.current_step = 0
@@ -267,6 +399,14 @@ class CarnivoreEnv(gym.Env):
         obs = self.render(mode='rgb_array')
         return obs, {}
 
+    def new_map(self):
+        if self.library_entries:
+            entry = self.seed_library.load(random.choice(self.library_entries))
+            return Map(int(entry["seed"]), terrain_backend=str(entry["terrain_backend"]), seed_entry=entry)
+        if self.terrain_cache is None:
+            self.terrain_cache = TerrainCache()
+        return Map(random.randint(0, 1000000), terrain_cache=self.terrain_cache)
+
     def step(self, action):
         self.current_step += 1
 
@@ -291,8 +431,8 @@ class CarnivoreEnv(gym.Env):
             done = True
         info = {}
         total_herbivores_alive = 0
-        for agent in self.simmap.agents:
-            if agent.species['diet'] == 'herbivore' and agent.alive:
+        for agent in self.simmap.agents.with_diet('herbivore'):
+            if agent.alive:
                 total_herbivores_alive += 1
         if (self.current_step % 100 == 0):
             print(f"Total herbivores alive: {total_herbivores_alive}", f"Step: {self.current_step}", f"Reward: {reward}")
@@ -331,9 +471,9 @@ class CarnivoreEnv(gym.Env):
             agent.move_down_right()
 
     def render(self, mode='human'):
-        self.simmap.draw(self.screen)
-        self.simmap.draw_agents(self.screen)
-        pygame.display.flip()
+        dirty_rects = self.simmap.draw(self.screen, incremental=(mode == 'human'))
+        dirty_rects += self.simmap.draw_agents(self.screen)
+        pygame.display.update(dirty_rects)
 
         if mode == 'rgb_array':
             return pygame.surfarray.array3d(self.screen).swapaxes(0, 1)
@@ -0,0 +1,54 @@
+# species_table.py
+# Species interned as small integer ids. A species_ref dict is converted once at load
+# time into a columnar parameter table, one NumPy array per parameter indexed by
+# species id, for vectorized code. Object agents instead hold a reference to their
+# species' SpeciesParams record, so the per-tick code reads plain attributes rather
+# than looking up dict keys and comparing diet strings.
+import math
+import numpy as np
+
+HERBIVORE, CARNIVORE = 0, 1
+DIETS = ["herbivore", "carnivore"]  # Diet id -> name used in species_ref
+MEAT_PER_KG = 1500  # Meat calories in a fresh carcass per kg of adult body mass
+
+# Column name -> dtype of its array in SpeciesTable
+COLUMNS = {
+    "diet": np.int8,
+    "is_herbivore": np.bool_,
+    "body_mass": np.float64,
+    "max_longevity": np.float64,
+    "age_at_first_birth": np.float64,
+    "home_range": np.float64,
+    "move_step": np.float64,
+    "meat_calories": np.float64,
+}
+
+
+class SpeciesParams:
+    # One species' parameters, shared by every agent of that species
+    __slots__ = ("species_id", "name") + tuple(COLUMNS)
+
+    def __init__(self, species_id, ref):
+        self.species_id = species_id
+        self.name = ref["common_name"]
+        self.diet = DIETS.index(ref["diet"])
+        self.is_herbivore = self.diet == HERBIVORE
+        self.body_mass = ref["adult_body_mass"]
+        self.max_longevity = ref["max_longevity"]
+        self.age_at_first_birth = ref["age_at_first_birth"]
+        self.home_range = ref["home_range"]
+        self.move_step = math.sqrt(self.home_range) * 0.5 * 0.5  # Pixels per random-walk step
+        self.meat_calories = self.body_mass * MEAT_PER_KG
+
+
+class SpeciesTable:
+    def __init__(self, species_ref):
+        self.names = list(species_ref)
+        self.ids = {name: species_id for species_id, name in enumerate(self.names)}
+        self.refs = [species_ref[name] for name in self.names]
+        self.params = [SpeciesParams(species_id, ref) for species_id, ref in enumerate(self.refs)]
+        for name, dtype in COLUMNS.items():
+            setattr(self, name, np.array([getattr(params, name) for params in self.params], dtype=dtype))
+
+    def __len__(self):
+        return len(self.names)
@@ -0,0 +1,103 @@
+# terrain_cache.py
+# On-disk cache of heightmaps and region rasters, keyed by the terrain parameters.
+# Entries are opened with np.load(mmap_mode='r') so env workers in different
+# processes share the same pages through the OS page cache.
+import argparse
+import os
+import numpy as np
+
+CACHE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "terrain_cache")
+MAX_CACHE_BYTES = 256 * 1024 * 1024  # Evict least recently used entries above this size
+
+
+class TerrainCache:
+    def __init__(self, cache_dir=CACHE_DIR, max_bytes=MAX_CACHE_BYTES):
+        self.cache_dir = cache_dir
+        self.max_bytes = max_bytes
+        os.makedirs(self.cache_dir, exist_ok=True)
+
+    def entry_name(self, key):
+        # key is (seed, pixels, noise_scale, octaves, persistence, lacunarity, terrain_backend)
+        return "_".join(str(part) for part in key)
+
+    def paths(self, key):
+        name = self.entry_name(key)
+        return (os.path.join(self.cache_dir, name + "_world.npy"),
+                os.path.join(self.cache_dir, name + "_regions.npy"))
+
+    def contains(self, key):
+        return all(os.path.exists(path) for path in self.paths(key))
+
+    def load(self, key):
+        world_path, region_path = self.paths(key)
+        try:
+            world = np.load(world_path, mmap_mode='r')
+            region_grid = np.load(region_path, mmap_mode='r')
+        except (FileNotFoundError, ValueError):
+            return None
+        # Touch the entry so eviction treats it as recently used
+        for path in (world_path, region_path):
+            try:
+                os.utime(path)
+            except FileNotFoundError:
+                pass
+        return world, region_grid
+
+    def store(self, key, world, region_grid):
+        for path, array in zip(self.paths(key), (world, region_grid)):
+            # Write to a private temp file first so concurrent workers never see a partial entry
+            tmp_path = f"{path}.{os.getpid()}.tmp"
+            with open(tmp_path, "wb") as f:
+                np.save(f, array)
+            os.replace(tmp_path, path)
+        self.evict()
+        loaded = self.load(key)
+        return loaded if loaded is not None else (world, region_grid)
+
+    def evict(self):
+        entries = {}
+        for file_name in os.listdir(self.cache_dir):
+            if not file_name.endswith(".npy"):
+                continue
+            path = os.path.join(self.cache_dir, file_name)
+            try:
+                stat = os.stat(path)
+            except FileNotFoundError:
+                continue
+            name = file_name.rsplit("_", 1)[0]
+            size, last_used = entries.get(name, (0, 0))
+            entries[name] = (size + stat.st_size, max(last_used, stat.st_mtime))
+
+        total = sum(size for size, _ in entries.values())
+        for name, (size, _) in sorted(entries.items(), key=lambda item: item[1][1]):
+            if total <= self.max_bytes:
+                break
+            for suffix in ("_world.npy", "_regions.npy"):
+                try:
+                    os.remove(os.path.join(self.cache_dir, name + suffix))
+                except FileNotFoundError:
+                    pass
+            total -= size
+
+    def size(self):
+        return sum(os.path.getsize(os.path.join(self.cache_dir, file_name))
+                   for file_name in os.listdir(self.cache_dir) if file_name.endswith(".npy"))
+
+
+def warm_up(cache, seeds):
+    from single_agent_env import Map
+
+    for seed in seeds:
+        simmap = Map(seed, terrain_cache=cache)
+        print(f"Cached terrain for seed {seed} ({cache.entry_name(simmap.terrain_key())})")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Pre-generate cached terrain for a range of seeds")
+    parser.add_argument("--start", type=int, default=0)
+    parser.add_argument("--stop", type=int, default=100)
+    parser.add_argument("--cache-dir", default=CACHE_DIR)
+    parser.add_argument("--max-bytes", type=int, default=MAX_CACHE_BYTES)
+    args = parser.parse_args()
+
+    warm_up(TerrainCache(args.cache_dir, args.max_bytes), range(args.start, args.stop))